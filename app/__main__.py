@@ -1,12 +1,20 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Request
+from fastapi.responses import JSONResponse
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.endpoints import routers
-from app.config import settings
+from app.config import settings, close_async_redis_client
+from app.utils.requests import open_judge0_client, close_judge0_client
+from app.utils.auth import PasswordHashingBusy, shutdown_password_executor
+from app.utils.rate_limit import AuthRateLimited
+from app.workers.dispatcher import run_dispatcher
+from app.workers.reconciler import run_reconciler
 
 
 def add_specification_info(app: FastAPI):
@@ -28,10 +36,47 @@ def add_routers(app: FastAPI, router_list: list[APIRouter]):
         app.include_router(router, prefix=settings.PATH_PREFIX)
 
 
+def add_exception_handlers(app: FastAPI):
+    @app.exception_handler(PasswordHashingBusy)
+    async def password_hashing_busy(request: Request, exc: PasswordHashingBusy):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Too many authentication requests, try later"},
+            headers={"Retry-After": str(settings.PASSWORD_HASHING_RETRY_AFTER)},
+        )
+
+    @app.exception_handler(AuthRateLimited)
+    async def auth_rate_limited(request: Request, exc: AuthRateLimited):
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Too many failed authentication attempts, try later"},
+            headers={"Retry-After": str(settings.AUTH_RATE_LIMIT_WINDOW)},
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings.check_auth_secret_key()
+    await open_judge0_client()
+    workers = []
+    if settings.DISPATCHER_ENABLED:
+        workers.append(asyncio.create_task(run_dispatcher()))
+    if settings.RECONCILER_ENABLED:
+        workers.append(asyncio.create_task(run_reconciler()))
+    yield
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await close_judge0_client()
+    await close_async_redis_client()
+    shutdown_password_executor()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(docs_url=None)
+    app = FastAPI(docs_url=None, lifespan=lifespan)
     add_specification_info(app)
     add_routers(app, routers)
+    add_exception_handlers(app)
     app.mount(
         path=settings.PATH_PREFIX + settings.STATIC_URL,
         app=StaticFiles(directory=settings.STATIC_FILES_DIR),
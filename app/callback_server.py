@@ -1,8 +1,165 @@
-from fastapi import FastAPI
+"""
+Service for processing responses from judge0.
 
-from app.endpoints import callback_server_router
+Callback workers are scaled separately from the main app, so this entry point imports only
+what applying results needs: plain Starlette instead of FastAPI, no routers, schemas of API
+or mail dependencies
+"""
+import asyncio
+import json
+import os
+import socket
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+from uuid import UUID
 
+from pydantic import ValidationError
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
 
-app = FastAPI()
-# Service for processing responses from judge0
-app.include_router(callback_server_router)
+from app.config import settings, close_async_redis_client
+from app.db import SessionManager
+from app.db.models import Attempt
+from app.schemas.callback_server import CallbackServerRequest
+from app.utils.verdict import (
+    apply_submission_result,
+    apply_single_run_result,
+    share_verdict,
+    ResultNotReady,
+)
+from app.utils.result_queue import enqueue_result
+from app.utils.submission_output import OUTPUT_FIELDS, truncate_text
+from app.workers.result_applier import run_result_applier
+
+
+async def apply_with_retry(session: AsyncSession, apply: Callable[[], Awaitable[Attempt | Row | None]]) -> None:
+    """
+    Apply result, waiting for dispatcher to save submission only if it's not known yet.
+    Runner repeats callback after error response, lost results are fetched by reconciler
+    """
+    delay = settings.CALLBACK_RETRY_DELAY
+    for _ in range(settings.CALLBACK_RETRIES):
+        try:
+            attempt = await apply()
+            break
+        except ResultNotReady:
+            await session.rollback()
+            await asyncio.sleep(delay)
+            delay *= 2
+    else:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    await session.commit()
+    if attempt is not None:
+        await share_verdict(attempt)
+
+
+async def read_body(request: Request) -> bytearray:
+    """Body is read by chunks and rejected as soon as it exceeds size limit"""
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > settings.CALLBACK_MAX_BODY_SIZE:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > settings.CALLBACK_MAX_BODY_SIZE:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    return body
+
+
+async def read_message(request: Request, full_fields: tuple[str, ...] = ()) -> CallbackServerRequest:
+    """
+    Whole body is parsed first, its memory is bounded only by CALLBACK_MAX_BODY_SIZE.
+    Parsed output fields are truncated to stored size before pydantic validation,
+    so program printing in a loop does not make callback validate and queue its whole output
+    :param full_fields: fields needed as is
+    """
+    try:
+        data = json.loads(await read_body(request))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    if isinstance(data, dict):
+        for field in OUTPUT_FIELDS:
+            if field not in full_fields and isinstance(data.get(field), str):
+                data[field] = truncate_text(data[field], settings.SUBMISSION_OUTPUT_MAX_SIZE)
+    try:
+        return CallbackServerRequest.model_validate(data)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+
+def get_uuid_param(value: str | None) -> UUID | None:
+    try:
+        return UUID(value) if value is not None else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+
+def get_int_param(value: str | None) -> int | None:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+
+async def callback(request: Request) -> Response:
+    message = await read_message(request)
+    attempt_id = get_uuid_param(request.query_params.get("attempt_id"))
+    testcase_id = get_int_param(request.query_params.get("testcase_id"))
+    dispatch_id = get_uuid_param(request.query_params.get("dispatch_id"))
+    if settings.CALLBACK_QUEUE_ENABLED:
+        # Applied by result appliers in micro-batches
+        await enqueue_result(message, attempt_id, testcase_id, dispatch_id)
+        return Response()
+    async with request.app.state.session_maker() as session:
+        await apply_with_retry(
+            session,
+            lambda: apply_submission_result(session, message, attempt_id, testcase_id, dispatch_id),
+        )
+    return Response()
+
+
+async def single_run_callback(request: Request) -> Response:
+    """
+    Result of single run attempt: split harness output into per-test submissions
+    """
+    attempt_id = get_uuid_param(request.path_params["attempt_id"])
+    # Harness output holds results of all tests
+    message = await read_message(request, full_fields=("stdout",))
+    async with request.app.state.session_maker() as session:
+        await apply_with_retry(
+            session,
+            lambda: apply_single_run_result(session, attempt_id, message),
+        )
+    return Response()
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    app.state.session_maker = SessionManager().get_session_maker()
+    workers = []
+    if settings.CALLBACK_QUEUE_ENABLED:
+        consumer = f"{socket.gethostname()}-{os.getpid()}"
+        workers = [
+            asyncio.create_task(run_result_applier(f"{consumer}-{i}"))
+            for i in range(settings.CALLBACK_QUEUE_WORKERS)
+        ]
+    yield
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await close_async_redis_client()
+
+
+app = Starlette(
+    routes=[
+        Route("/", callback, methods=["PUT"]),
+        Route("/run/{attempt_id}", single_run_callback, methods=["PUT"]),
+    ],
+    lifespan=lifespan,
+)
@@ -1,2 +1,2 @@
-from .config import settings, mail_config
-from .redis import get_redis_client
+from .config import settings
+from .redis import get_redis_client, get_async_redis_client, close_async_redis_client
@@ -1,10 +1,13 @@
 from os import getenv
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from fastapi_mail import ConnectionConfig
 from redis import Redis
 
 
+# Default and sample values of AUTH_SECRET_KEY
+INSECURE_SECRET_KEYS = ('', 'secret', 'change-me')
+
+
 class Settings(BaseSettings):
 
     model_config = SettingsConfigDict(
@@ -29,6 +32,32 @@ class Settings(BaseSettings):
     REDIS_PORT: int = int(getenv('REDIS_PORT', 6379))
     REDIS_DB: int = int(getenv('REDIS_DB', 0))
 
+    # Signed session tokens, service refuses to start with publicly known key (except tests)
+    AUTH_SECRET_KEY: str = getenv('AUTH_SECRET_KEY', 'secret')
+    ACCESS_TOKEN_TTL: int = int(getenv('ACCESS_TOKEN_TTL', 15 * 60))
+    REFRESH_TOKEN_TTL: int = int(getenv('REFRESH_TOKEN_TTL', 30 * 24 * 3600))
+    # Failed password checks in sliding window, more checks are rejected before hashing
+    AUTH_RATE_LIMIT_ENABLED: bool = bool(int(getenv('AUTH_RATE_LIMIT_ENABLED', 1)))
+    AUTH_RATE_LIMIT_WINDOW: int = int(getenv('AUTH_RATE_LIMIT_WINDOW', 60))
+    AUTH_RATE_LIMIT_PER_USERNAME: int = int(getenv('AUTH_RATE_LIMIT_PER_USERNAME', 10))
+    AUTH_RATE_LIMIT_PER_IP: int = int(getenv('AUTH_RATE_LIMIT_PER_IP', 50))
+    # Header with client address set by reverse proxy, connection address is used if empty.
+    # Header is trusted only on connections from TRUSTED_PROXIES, comma separated addresses or networks
+    CLIENT_IP_HEADER: str = getenv('CLIENT_IP_HEADER', '')
+    TRUSTED_PROXIES: str = getenv('TRUSTED_PROXIES', '')
+    # Authenticated users cached in Redis and in process memory, seconds
+    USER_CACHE_ENABLED: bool = bool(int(getenv('USER_CACHE_ENABLED', 1)))
+    USER_CACHE_TTL: int = int(getenv('USER_CACHE_TTL', 60))
+    USER_CACHE_LOCAL_TTL: float = float(getenv('USER_CACHE_LOCAL_TTL', 5))
+    USER_CACHE_LOCAL_SIZE: int = int(getenv('USER_CACHE_LOCAL_SIZE', 10000))
+    # Password hashing threads, waiting checks above queue limit are rejected with 503
+    PASSWORD_HASHING_WORKERS: int = int(getenv('PASSWORD_HASHING_WORKERS', 2))
+    PASSWORD_HASHING_QUEUE_LIMIT: int = int(getenv('PASSWORD_HASHING_QUEUE_LIMIT', 64))
+    PASSWORD_HASHING_RETRY_AFTER: int = int(getenv('PASSWORD_HASHING_RETRY_AFTER', 1))
+    # Basic authorization headers with checked password, cached per process
+    AUTH_CREDENTIALS_CACHE_SIZE: int = int(getenv('AUTH_CREDENTIALS_CACHE_SIZE', 10000))
+    AUTH_CREDENTIALS_CACHE_TTL: float = float(getenv('AUTH_CREDENTIALS_CACHE_TTL', 300))
+
     # In Docker?
     DOCKER: bool = bool(getenv('DOCKER', 0))
 
@@ -37,8 +66,83 @@ class Settings(BaseSettings):
 
     JUDGE0_HOST: str = getenv('JUDGE0_HOST', 'http://runner-server')
     JUDGE0_PORT: int = int(getenv('JUDGE0_PORT', 2358))
+    # Comma separated runner node urls (http://runner-1:2358,http://runner-2:2358),
+    # single JUDGE0_HOST:JUDGE0_PORT node if empty
+    JUDGE0_NODES: str = getenv('JUDGE0_NODES', '')
+    # Send attempt testcases via /submissions/batch
+    JUDGE0_BATCHED_SUBMISSIONS: bool = bool(int(getenv('JUDGE0_BATCHED_SUBMISSIONS', 1)))
+    # Must not exceed MAX_SUBMISSION_BATCH_SIZE from runner/judge0.conf
+    JUDGE0_MAX_BATCH_SIZE: int = int(getenv('JUDGE0_MAX_BATCH_SIZE', 20))
+    # Maximal limits accepted by runner (MAX_CPU_TIME_LIMIT, MAX_WALL_TIME_LIMIT of judge0.conf)
+    JUDGE0_MAX_CPU_TIME_LIMIT: float = float(getenv('JUDGE0_MAX_CPU_TIME_LIMIT', 15))
+    JUDGE0_MAX_WALL_TIME_LIMIT: float = float(getenv('JUDGE0_MAX_WALL_TIME_LIMIT', 20))
+    # Time for compilation and harness in single run mode, seconds
+    SINGLE_RUN_EXTRA_TIME: float = float(getenv('SINGLE_RUN_EXTRA_TIME', 2))
+    FAIL_FAST_WAVE_SIZE: int = int(getenv('FAIL_FAST_WAVE_SIZE', 4))
+    # Shared Judge0 HTTP client
+    JUDGE0_MAX_CONNECTIONS: int = int(getenv('JUDGE0_MAX_CONNECTIONS', 100))
+    JUDGE0_MAX_KEEPALIVE_CONNECTIONS: int = int(getenv('JUDGE0_MAX_KEEPALIVE_CONNECTIONS', 20))
+    JUDGE0_KEEPALIVE_EXPIRY: float = float(getenv('JUDGE0_KEEPALIVE_EXPIRY', 30))
+    JUDGE0_TIMEOUT: float = float(getenv('JUDGE0_TIMEOUT', 10))
+    JUDGE0_CONNECT_TIMEOUT: float = float(getenv('JUDGE0_CONNECT_TIMEOUT', 5))
+    # Retries of requests that did not reach runner or were rejected as overload
+    JUDGE0_RETRIES: int = int(getenv('JUDGE0_RETRIES', 3))
+    JUDGE0_RETRY_BASE_DELAY: float = float(getenv('JUDGE0_RETRY_BASE_DELAY', 0.2))
+    JUDGE0_RETRY_MAX_DELAY: float = float(getenv('JUDGE0_RETRY_MAX_DELAY', 2))
+    # Circuit breaker opens after consecutive failures and lets a trial request through after timeout
+    JUDGE0_BREAKER_FAILURES: int = int(getenv('JUDGE0_BREAKER_FAILURES', 5))
+    JUDGE0_BREAKER_RESET_TIMEOUT: float = float(getenv('JUDGE0_BREAKER_RESET_TIMEOUT', 30))
 
     CALLBACK_URL: str = getenv('CALLBACK_URL', 'http://callback-server/')
+    # Larger callback body is rejected, bytes
+    CALLBACK_MAX_BODY_SIZE: int = int(getenv('CALLBACK_MAX_BODY_SIZE', 8 * 1024 * 1024))
+    # Result with unknown token is retried with doubling delay, then runner retries callback
+    CALLBACK_RETRIES: int = int(getenv('CALLBACK_RETRIES', 5))
+    CALLBACK_RETRY_DELAY: float = float(getenv('CALLBACK_RETRY_DELAY', 0.1))
+    # Callback only puts result to Redis stream, results are applied by workers in micro-batches
+    CALLBACK_QUEUE_ENABLED: bool = bool(int(getenv('CALLBACK_QUEUE_ENABLED', 0)))
+    CALLBACK_QUEUE_WORKERS: int = int(getenv('CALLBACK_QUEUE_WORKERS', 2))
+    CALLBACK_BATCH_SIZE: int = int(getenv('CALLBACK_BATCH_SIZE', 200))
+    # Longest wait for new results, seconds
+    CALLBACK_BATCH_WAIT: float = float(getenv('CALLBACK_BATCH_WAIT', 0.05))
+    # Results not applied for this time (crashed worker or unknown token) are taken again, seconds
+    CALLBACK_QUEUE_RETRY_AFTER: float = float(getenv('CALLBACK_QUEUE_RETRY_AFTER', 5))
+
+    # Attempt outbox dispatcher
+    DISPATCHER_ENABLED: bool = bool(int(getenv('DISPATCHER_ENABLED', 1)))
+    DISPATCHER_POLL_INTERVAL: float = float(getenv('DISPATCHER_POLL_INTERVAL', 1))
+    DISPATCHER_BATCH_SIZE: int = int(getenv('DISPATCHER_BATCH_SIZE', 10))
+    # Claimed attempt is retried after lease expiration
+    DISPATCHER_LEASE_SECONDS: int = int(getenv('DISPATCHER_LEASE_SECONDS', 30))
+    DISPATCHER_MAX_TRIES: int = int(getenv('DISPATCHER_MAX_TRIES', 3))
+    # Cluster-wide number of simultaneous requests to Judge0
+    DISPATCH_MAX_CONCURRENCY: int = int(getenv('DISPATCH_MAX_CONCURRENCY', 8))
+    DISPATCH_SLOT_WAIT: float = float(getenv('DISPATCH_SLOT_WAIT', 0.05))
+    # Runner node gets no dispatch while its queue depth is above this (keep below MAX_QUEUE_SIZE of judge0.conf)
+    DISPATCH_RUNNER_QUEUE_LIMIT: int = int(getenv('DISPATCH_RUNNER_QUEUE_LIMIT', 80))
+    DISPATCH_QUEUE_PROBE_INTERVAL: float = float(getenv('DISPATCH_QUEUE_PROBE_INTERVAL', 1))
+    # Attempts of practices with deadline closer than this go first
+    DISPATCH_URGENT_WINDOW: int = int(getenv('DISPATCH_URGENT_WINDOW', 3600))
+    # New attempts are rejected with 429 when outbox is that long
+    DISPATCH_MAX_BACKLOG: int = int(getenv('DISPATCH_MAX_BACKLOG', 2000))
+    DISPATCH_RETRY_AFTER: int = int(getenv('DISPATCH_RETRY_AFTER', 30))
+
+    # Reuse verdict of identical attempt instead of running it again
+    VERDICT_CACHE_ENABLED: bool = bool(int(getenv('VERDICT_CACHE_ENABLED', 1)))
+    VERDICT_CACHE_TTL: int = int(getenv('VERDICT_CACHE_TTL', 7 * 24 * 3600))
+
+    # Fetch results of submissions, which callbacks were lost
+    RECONCILER_ENABLED: bool = bool(int(getenv('RECONCILER_ENABLED', 1)))
+    RECONCILER_INTERVAL: float = float(getenv('RECONCILER_INTERVAL', 30))
+    # Submission without callback for this time (seconds) is fetched from runner
+    RECONCILER_STALE_AFTER: int = int(getenv('RECONCILER_STALE_AFTER', 120))
+    RECONCILER_BATCH_SIZE: int = int(getenv('RECONCILER_BATCH_SIZE', 500))
+
+    # Program output of tests, stored compressed in submission_output table
+    SUBMISSION_OUTPUT_ENABLED: bool = bool(int(getenv('SUBMISSION_OUTPUT_ENABLED', 1)))
+    # Longer output keeps its head and tail, bytes per field
+    SUBMISSION_OUTPUT_MAX_SIZE: int = int(getenv('SUBMISSION_OUTPUT_MAX_SIZE', 64 * 1024))
+    SUBMISSION_OUTPUT_COMPRESSION_LEVEL: int = int(getenv('SUBMISSION_OUTPUT_COMPRESSION_LEVEL', 6))
 
     STATIC_FILES_DIR: str = getenv('STATIC_FILES_DIR', 'static')
     STATIC_URL: str = getenv('STATIC_URL', '/static')
@@ -53,13 +157,20 @@ class Settings(BaseSettings):
         return (f'postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}'
                 f'@{postgres_host}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}')
 
+    def check_auth_secret_key(self) -> None:
+        """
+        Tokens signed by publicly known key can be forged by anyone
+        :raise RuntimeError: if key is not set outside of tests
+        """
+        if getenv('ENV') != 'test' and self.AUTH_SECRET_KEY in INSECURE_SECRET_KEYS:
+            raise RuntimeError('AUTH_SECRET_KEY is not set, generate it with `openssl rand -hex 32`')
+
     def get_db_url_async(self) -> str:
         return (f'postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}'
                 f'@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}')
 
 
 settings = Settings()
-mail_config = ConnectionConfig(_env_file='.env', _env_file_encoding='utf-8', _env_prefix='M_')
 redis = Redis(
     host=settings.REDIS_HOST,
     port=settings.REDIS_PORT,
@@ -6,10 +6,35 @@ class Language:
     id: int
     name: str
     judge0id: int
+    # Commands inside runner sandbox, used by single run harness
+    source_file: str
+    run_cmd: str
+    compile_cmd: str | None = None
 
 
+# Judge0 "Multi-file program" language
+MULTI_FILE_JUDGE0_ID = 89
+
 LANGUAGES = {
-    1: Language(id=1, name="Python 3.8", judge0id=71),
-    2: Language(id=2, name="Bash 5.0", judge0id=46),
+    1: Language(
+        id=1,
+        name="Python 3.8",
+        judge0id=71,
+        source_file="script.py",
+        # Bytecode is compiled once, syntax error is reported as compilation error
+        compile_cmd=(
+            "/usr/local/python-3.8.1/bin/python3 -c "
+            "\"import py_compile; py_compile.compile('script.py', cfile='script.pyc', doraise=True)\""
+        ),
+        run_cmd="/usr/local/python-3.8.1/bin/python3 script.pyc",
+    ),
+    2: Language(
+        id=2,
+        name="Bash 5.0",
+        judge0id=46,
+        source_file="script.sh",
+        # Interpreted line by line, nothing to compile
+        run_cmd="/usr/local/bash-5.0/bin/bash script.sh",
+    ),
 }
 ARCHIVED = {}
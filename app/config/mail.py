@@ -0,0 +1,4 @@
+from fastapi_mail import ConnectionConfig
+
+# Imported only by endpoints sending mail, callback server does not load mail dependencies
+mail_config = ConnectionConfig(_env_file='.env', _env_file_encoding='utf-8', _env_prefix='M_')
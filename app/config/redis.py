@@ -1,9 +1,11 @@
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 
 from .config import settings
 
 
 _client = None
+_async_client = None
 
 
 def get_redis_client():
@@ -12,3 +14,18 @@ def get_redis_client():
     if _client is None:
         _client = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0)
     return _client
+
+
+def get_async_redis_client() -> AsyncRedis:
+    """Lazy loading asyncio redis client"""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncRedis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0)
+    return _async_client
+
+
+async def close_async_redis_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
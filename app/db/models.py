@@ -14,10 +14,13 @@ from sqlalchemy import (
     LargeBinary,
     ForeignKey,
     UniqueConstraint,
+    Index,
     ARRAY,
     Integer,
     JSON,
     TIMESTAMP,
+    func,
+    text,
 )
 
 
@@ -61,6 +64,8 @@ class Course(Base):
     name: Mapped[str] = mapped_column(String(100))
     description: Mapped[str] = mapped_column()
     image_id: Mapped[UUID] = mapped_column(nullable=True)
+    # Share of runner capacity relative to other courses with pending attempts
+    dispatch_weight: Mapped[int] = mapped_column(default=1, server_default="1")
 
     participants: Mapped[List[User]] = relationship(
         secondary=Participation.__table__, back_populates='courses',
@@ -92,6 +97,9 @@ class Practice(Base):
     command_line_args: Mapped[str] = mapped_column(String(512), default="")
     network: Mapped[bool] = mapped_column()
     allow_multi_file: Mapped[bool] = mapped_column()
+    execution_mode: Mapped[str] = mapped_column(String(20), default="PER_TEST", server_default="PER_TEST")
+    # Stop testing attempt after first failed test
+    fail_fast: Mapped[bool] = mapped_column(default=False, server_default="false")
 
 
 class TestCase(Base):
@@ -114,6 +122,15 @@ class Attempt(Base):
     status: Mapped[str] = mapped_column(String(50))
     tests_needed: Mapped[int] = mapped_column(default=0)
     tests_completed: Mapped[int] = mapped_column(default=0)
+    # Number of completed tests by status
+    accepted_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    wrong_answer_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    time_limit_exceed_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    memory_limit_exceed_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    runtime_error_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    compilation_error_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    service_error_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    skipped_count: Mapped[int] = mapped_column(default=0, server_default="0")
 
     author_id: Mapped[UUID] = mapped_column(ForeignKey('user.id'))
     author: Mapped["User"] = relationship(back_populates="attempts")
@@ -121,6 +138,12 @@ class Attempt(Base):
     practice: Mapped["Practice"] = relationship(back_populates='attempts')
     submissions: Mapped[list["Submission"]] = relationship(back_populates="attempt", lazy='selectin')
 
+    @property
+    def status_counts(self) -> dict[str, int]:
+        """Non-zero counters of tests by status"""
+        counts = {status: getattr(self, get_status_counter_name(status)) for status in COUNTED_STATUSES}
+        return {status: count for status, count in counts.items() if count}
+
 
 class Submission(Base):
     __tablename__ = 'submission'
@@ -134,6 +157,67 @@ class Submission(Base):
         nullable=True,
     )
     attempt: Mapped["Attempt"] = relationship(back_populates="submissions", lazy='selectin')
+    testcase_id: Mapped[int] = mapped_column(
+        ForeignKey("testcase.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    # Runner node that issued token
+    node: Mapped[str] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        type_=TIMESTAMP(timezone=True), server_default=func.now(),
+    )
+    __table_args__ = (
+        # Late result of skipped or redispatched test does not add second submission
+        UniqueConstraint("attempt_id", "testcase_id", name="unique_submission_testcase"),
+        # Submissions waiting for results, scanned by reconciler
+        Index(
+            "ix_submission_in_queue_created_at",
+            "created_at",
+            postgresql_where=text("status = 'IN_QUEUE'"),
+        ),
+    )
+
+
+class SubmissionOutput(Base):
+    """
+    Compressed program output of submission, kept apart from submission table and loaded on request
+    """
+    __tablename__ = 'submission_output'
+    token: Mapped[UUID] = mapped_column(
+        ForeignKey("submission.token", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    stdout: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
+    stderr: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
+    compile_output: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
+    message: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
+
+
+class AttemptOutbox(Base):
+    """
+    Attempt waiting for dispatch to Judge0, written in the same transaction as the attempt
+    """
+    __tablename__ = 'attempt_outbox'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    attempt_id: Mapped[UUID] = mapped_column(
+        ForeignKey("attempt.id", ondelete="CASCADE"),
+        unique=True,
+    )
+    source_code: Mapped[str] = mapped_column(String)
+    # Copied from attempt for scheduling
+    author_id: Mapped[UUID] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"))
+    course_id: Mapped[UUID] = mapped_column(ForeignKey("course.id", ondelete="CASCADE"))
+    deadline: Mapped[datetime] = mapped_column(type_=TIMESTAMP(timezone=True))
+    # Late attempt or re-run of accepted practice, dispatched after all others
+    demoted: Mapped[bool] = mapped_column(default=False, server_default="false")
+    created_at: Mapped[datetime] = mapped_column(
+        type_=TIMESTAMP(timezone=True), server_default=func.now(),
+    )
+    # Claimed by dispatcher until this time
+    locked_until: Mapped[datetime] = mapped_column(type_=TIMESTAMP(timezone=True), nullable=True)
+    tries: Mapped[int] = mapped_column(default=0)
+    # Fail fast attempt waiting for results of previous wave of tests
+    parked: Mapped[bool] = mapped_column(default=False, server_default="false")
 
 
 class SubmissionStatus(StrEnum):
@@ -145,3 +229,21 @@ class SubmissionStatus(StrEnum):
     RUNTIME_ERROR = "RUNTIME_ERROR"
     SERVICE_ERROR = "SERVICE_ERROR"
     COMPILATION_ERROR = "COMPILATION_ERROR"
+    # Not tested: attempt already failed in fail fast mode
+    SKIPPED = "SKIPPED"
+
+
+class ExecutionMode(StrEnum):
+    # Judge0 submission per testcase
+    PER_TEST = "PER_TEST"
+    # One Judge0 submission runs all testcases (compile once)
+    SINGLE_RUN = "SINGLE_RUN"
+
+
+# Final statuses of tests, counted on attempt
+COUNTED_STATUSES = tuple(status for status in SubmissionStatus if status != SubmissionStatus.IN_QUEUE)
+
+
+def get_status_counter_name(status: str) -> str:
+    """Attempt column with number of tests in status"""
+    return f"{status.lower()}_count"
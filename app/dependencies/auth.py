@@ -1,18 +1,26 @@
 from typing import Annotated, Optional
 from base64 import b64decode
+from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import Header, HTTPException, status, Depends
+from fastapi import Header, HTTPException, status, Depends, Request
 
 from app.db.models import User
-from app.utils.auth import authenticate
+from app.utils.auth import authenticate_basic
+from app.utils.tokens import ACCESS_TOKEN, decode_token, session_is_revoked
+from app.utils.user_cache import get_cached_user
+from app.utils.rate_limit import get_client_ip
 from app.db.connection import get_session
 
 
 async def auth_dependency(
         authorization: Annotated[str, Header()],
         session: Annotated[AsyncSession, Depends(get_session)],
+        request: Request,
 ) -> Optional[User]:
+    if authorization.startswith('Bearer '):
+        return await authenticate_token(authorization.removeprefix('Bearer '), session)
+    # Legacy: password is checked on every request
     try:
         auth_data = authorization.removeprefix('Basic ')
         username, password = b64decode(auth_data).decode(encoding='utf-8').split(':')
@@ -22,7 +30,24 @@ async def auth_dependency(
             detail=f'Bad authorization header: {e}'
         )
     else:
-        user = await authenticate(username=username, password=password, session=session)
+        user = await authenticate_basic(
+            authorization=authorization,
+            username=username,
+            password=password,
+            session=session,
+            client_ip=get_client_ip(request),
+        )
         if user is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
         return user
+
+
+async def authenticate_token(token: str, session: AsyncSession) -> User:
+    """Access token is verified by signature, without password hashing"""
+    claims = decode_token(token, ACCESS_TOKEN)
+    if claims is None or await session_is_revoked(claims["sid"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    user = await get_cached_user(session, UUID(claims["sub"]))
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return user
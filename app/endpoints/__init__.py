@@ -5,7 +5,6 @@ from .course import router as course_router
 from .practice import router as practice_router
 from .language import router as lang_router
 from .attempt import router as attempt_router
-from .callback_server import router as callback_server_router
 from .testcase import router as testcase_router
 from .image import router as image_router
 
@@ -1,25 +1,81 @@
-from uuid import UUID
+from uuid import UUID, uuid4
 from typing import Annotated
-from datetime import datetime
+from datetime import datetime, timezone
 
 from fastapi import APIRouter, Path, Depends, Body, HTTPException, status, Response
 from starlette import status
-from sqlalchemy import select, desc, func, text
+from sqlalchemy import select, exists, desc, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
-from httpx import AsyncClient
 
-from app.config.languages import LANGUAGES
-from app.db import get_session, User, Practice, Course, Participation, Submission, SubmissionStatus, Attempt
+from app.db import (
+    get_session,
+    User,
+    Practice,
+    Participation,
+    Submission,
+    SubmissionOutput,
+    SubmissionStatus,
+    Attempt,
+    AttemptOutbox,
+    TestCase,
+    COUNTED_STATUSES,
+    get_status_counter_name,
+)
 from app.dependencies import auth_dependency, Pagination, pagination_dependency
-from app.schemas import AttemptOut, AttemptIn, PaginationResult, AttemptSummary
+from app.schemas.attempt import AttemptOut, AttemptIn, AttemptSummary, SubmissionOutputOut
+from app.schemas.pagination import PaginationResult
 from app.config import settings
-from app.utils import send_parallel_post
+from app.utils.backpressure import dispatch_statistics
+from app.utils.verdict_cache import get_verdict_key, get_cached_attempt_id
+from app.utils.submission_output import OUTPUT_FIELDS, load_output
+from app.utils.practice import practice_has_write_permission
+from app.workers.dispatcher import wake_dispatcher
 
 router = APIRouter(
     prefix='',
     tags=['Attempt'],
 )
 
+# Verdict of such attempts is not cached
+NOT_REUSABLE_STATUSES = (SubmissionStatus.IN_QUEUE, SubmissionStatus.SERVICE_ERROR)
+
+
+async def reuse_attempt_results(session: AsyncSession, cached_attempt: Attempt, attempt: Attempt) -> None:
+    """
+    Copy verdict, per-test results and their stored output of identical attempt
+    """
+    attempt.status = cached_attempt.status
+    attempt.tests_needed = cached_attempt.tests_needed
+    attempt.tests_completed = cached_attempt.tests_completed
+    for counter_name in map(get_status_counter_name, COUNTED_STATUSES):
+        setattr(attempt, counter_name, getattr(cached_attempt, counter_name))
+    attempt.meta = attempt.meta | {"reused_from": str(cached_attempt.id)}
+    # Token of cached submission -> token of its copy
+    tokens = {submission.token: uuid4() for submission in cached_attempt.submissions}
+    attempt.submissions = [
+        Submission(
+            token=tokens[submission.token],
+            status=submission.status,
+            time=submission.time,
+            memory=submission.memory,
+            testcase_id=submission.testcase_id,
+        )
+        for submission in cached_attempt.submissions
+    ]
+    session.add(attempt)
+    await session.flush()
+    outputs = await session.scalars(
+        select(SubmissionOutput).
+        where(SubmissionOutput.token.in_(tokens))
+    )
+    session.add_all(
+        SubmissionOutput(
+            token=tokens[output.token],
+            **{field: getattr(output, field) for field in OUTPUT_FIELDS},
+        )
+        for output in outputs
+    )
+
 
 @router.post(
     path='/practice/{practice_id}/attempt',
@@ -52,71 +108,68 @@ async def send_attempt(
         )
     # Get testcases
     testcases = list(practice.testcases)
+    sent_time = datetime.now(timezone.utc)
+    verdict_key = get_verdict_key(
+        practice=practice,
+        testcases=testcases,
+        source_code=attempt_data.source_code,
+        language_id=attempt_data.language_id,
+    )
     # Create attempt object
     attempt = Attempt(
         language_id=attempt_data.language_id,
-        meta={},
-        sent_time=datetime.now(),
+        meta={"verdict_key": verdict_key},
+        sent_time=sent_time,
         author_id=user.id,
         practice_id=practice_id,
         status=SubmissionStatus.IN_QUEUE,
         tests_needed=len(testcases),
         tests_completed=0,
     )
-    session.add(attempt)
-    await session.commit()
-    submissions = []
-    # Preparing data for multiple submission
-    for testcase in testcases:
-        submissions.append(
-            {
-                "source_code": attempt_data.source_code,
-                "language_id": LANGUAGES[attempt_data.language_id].judge0id,
-                "memory_limit": practice.memory_limit,
-                "cpu_time_limit": practice.time_limit / 1000,
-                "expected_output": testcase.excepted,
-                "stdin": testcase.input,
-                "network": practice.network,
-                "max_threads": practice.max_threads,
-                "callback_url": f"{settings.CALLBACK_URL}:{settings.APP_PORT}",
-            }
-        )
-    # Lock row to create queue
-    await session.execute(
-        select(Attempt).
-        where(Attempt.id == attempt.id).
-        with_for_update()
+    # Reject only if dispatcher is far behind, otherwise attempt waits in outbox
+    backlog = await session.scalar(
+        select(func.count()).
+        select_from(AttemptOutbox).
+        where(AttemptOutbox.parked == False)
     )
-    # Send multiple submissions in one request
-    async with AsyncClient() as client:
-        responses = await send_parallel_post(
-            client=client,
-            url=f"{settings.JUDGE0_HOST}:{settings.JUDGE0_PORT}/submissions",
-            jsons=submissions,
+    if backlog >= settings.DISPATCH_MAX_BACKLOG:
+        dispatch_statistics["rejected_attempts"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts in queue, try later",
+            headers={"Retry-After": str(settings.DISPATCH_RETRY_AFTER)},
         )
-    # Check service availability
-    for response in responses:
-        if response.status_code not in (200, 201):
-            print(response)
-            print(response.text)
-            # if service not available: mark attempt as service error
-            attempt.status = SubmissionStatus.SERVICE_ERROR
+    # Identical attempt was already tested
+    cached_attempt_id = await get_cached_attempt_id(practice_id, verdict_key)
+    if cached_attempt_id:
+        cached_attempt = await session.get(Attempt, cached_attempt_id)
+        if cached_attempt and cached_attempt.status not in NOT_REUSABLE_STATUSES:
+            await reuse_attempt_results(session, cached_attempt, attempt)
             await session.commit()
-            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
-    submission_instances = []
-    for response in responses:
-        token = response.json()["token"]
-        submission_instances.append(
-            Submission(
-                token=token,
-                status=SubmissionStatus.IN_QUEUE,
-                time=0,
-                memory=0,
-                attempt_id=attempt.id,
-            )
+            return
+    # Late attempts and re-runs of accepted practice are dispatched last
+    already_accepted = await session.scalar(
+        select(exists().where(
+            Attempt.author_id == user.id,
+            Attempt.practice_id == practice_id,
+            Attempt.status == SubmissionStatus.ACCEPTED,
+        ))
+    )
+    session.add(attempt)
+    await session.flush()
+    # Attempt is sent to Judge0 by dispatcher worker
+    session.add(
+        AttemptOutbox(
+            attempt_id=attempt.id,
+            source_code=attempt_data.source_code,
+            author_id=user.id,
+            course_id=practice.course_id,
+            deadline=practice.deadline,
+            demoted=already_accepted or sent_time > practice.deadline,
         )
-    session.add_all(submission_instances)
+    )
     await session.commit()
+    wake_dispatcher()
 
 
 @router.get(
@@ -208,3 +261,45 @@ async def get_attempt_detailed(
     """
     Get detailed information about attempt
     """
+
+
+@router.get(
+    path='/practice/{practice_id}/attempt/{attempt_id}/submission/{token}/output',
+    response_model=SubmissionOutputOut,
+    status_code=status.HTTP_200_OK,
+)
+async def get_submission_output(
+        practice_id: Annotated[UUID, Path()],
+        attempt_id: Annotated[UUID, Path()],
+        token: Annotated[UUID, Path()],
+        user: Annotated[User, Depends(auth_dependency)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+) -> SubmissionOutputOut:
+    """
+    Program output of one test of attempt.
+    Output of hidden tests is shown only to teachers of course
+    """
+    practice = await session.get(Practice, practice_id)
+    if not practice:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    submission = await session.scalar(
+        select(Submission).
+        join(Attempt, Attempt.id == Submission.attempt_id).
+        where(Submission.token == token).
+        where(Attempt.id == attempt_id).
+        where(Attempt.practice_id == practice_id)
+    )
+    if not submission:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    is_teacher = await practice_has_write_permission(user, practice, session)
+    if submission.attempt.author_id != user.id and not is_teacher:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    output = await load_output(session, token)
+    if not is_teacher:
+        hidden = await session.scalar(
+            select(TestCase.hidden).
+            where(TestCase.id == submission.testcase_id)
+        )
+        if hidden is not False:
+            output |= {"stdout": None, "stderr": None}
+    return SubmissionOutputOut(**output)
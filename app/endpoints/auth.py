@@ -1,16 +1,20 @@
 from typing import Annotated
 from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Body, Path, Depends
+from fastapi import APIRouter, Body, Path, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse, Response
 from starlette import status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.schemas import UserIn, AuthenticationIn, AuthenticationOut, PasswordUpdate, RegistrationRequest
+from app.schemas.user import UserIn
+from app.schemas.auth import AuthenticationIn, AuthenticationOut, PasswordUpdate, RegistrationRequest, RefreshIn
 from app.dependencies import pagination_dependency, Pagination
-from app.config import mail_config, get_redis_client, settings
-from app.utils.auth import hash_password, create_user, create_user_with_hashed_password
+from app.config import get_redis_client, settings
+from app.config.mail import mail_config
+from app.utils.auth import hash_password, create_user, create_user_with_hashed_password, authenticate
+from app.utils.rate_limit import get_client_ip
+from app.utils.tokens import REFRESH_TOKEN, issue_tokens, decode_token, use_refresh_token, revoke_session
 from app.db import get_session, User
 
 router = APIRouter(prefix='', tags=['Authentication'])
@@ -63,3 +67,71 @@ async def confirm_registration(
             **data,
         )
         return Response('You\'re successfully confirmed your registration', status_code=status.HTTP_200_OK)
+
+
+def make_authentication_out(user_id: UUID, session_id: str | None = None) -> AuthenticationOut:
+    access_token, refresh_token = issue_tokens(user_id, session_id)
+    return AuthenticationOut(
+        token=access_token,
+        refresh_token=refresh_token,
+        expires_in=settings.ACCESS_TOKEN_TTL,
+    )
+
+
+@router.post(
+    path='/login',
+    response_model=AuthenticationOut,
+    status_code=status.HTTP_200_OK,
+)
+async def login(
+        credentials: Annotated[AuthenticationIn, Body()],
+        session: Annotated[AsyncSession, Depends(get_session)],
+        request: Request,
+) -> AuthenticationOut:
+    """
+    Check password once and issue tokens for "Authorization: Bearer <token>" header
+    """
+    user = await authenticate(
+        username=credentials.username,
+        password=credentials.password,
+        session=session,
+        client_ip=get_client_ip(request),
+    )
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return make_authentication_out(user.id)
+
+
+@router.post(
+    path='/token/refresh',
+    response_model=AuthenticationOut,
+    status_code=status.HTTP_200_OK,
+)
+async def refresh_token(
+        data: Annotated[RefreshIn, Body()],
+        session: Annotated[AsyncSession, Depends(get_session)],
+) -> AuthenticationOut:
+    """
+    Exchange refresh token for new pair of tokens, every refresh token is accepted once
+    """
+    claims = decode_token(data.refresh_token, REFRESH_TOKEN)
+    if claims is None or not await use_refresh_token(claims):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    user = await session.get(User, UUID(claims["sub"]))
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return make_authentication_out(user.id, claims["sid"])
+
+
+@router.post(
+    path='/logout',
+    status_code=status.HTTP_200_OK,
+)
+async def logout(data: Annotated[RefreshIn, Body()]):
+    """
+    Revoke session: its access and refresh tokens are not accepted anymore
+    """
+    claims = decode_token(data.refresh_token, REFRESH_TOKEN)
+    if claims is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    await revoke_session(claims["sid"])
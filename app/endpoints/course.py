@@ -7,7 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete, func
 
 from app.dependencies import auth_dependency
-from app.schemas import PaginationResult
+from app.schemas.pagination import PaginationResult
 from app.schemas.course import (
     CourseOut,
     CourseIn,
@@ -19,7 +19,7 @@ from app.schemas.course import (
 )
 from app.dependencies.pagination import pagination_dependency, Pagination
 from app.db import get_session, Course, User, Participation
-from app.utils import get_course_permission, CoursePermission, is_participant
+from app.utils.course import get_course_permission, CoursePermission, is_participant
 
 
 router = APIRouter(
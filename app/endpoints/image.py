@@ -4,7 +4,7 @@ from uuid import uuid4
 from fastapi import APIRouter, status, File
 
 from app.utils.file_storage import LocalFileStorage
-from app.schemas import ImageOut
+from app.schemas.image import ImageOut
 
 
 router = APIRouter(
@@ -4,7 +4,7 @@ from typing import Annotated
 from fastapi import APIRouter, Path, Body, Depends
 from starlette import status
 
-from app.schemas import Language as LanguageSchema
+from app.schemas.language import Language as LanguageSchema
 from app.config.languages import LANGUAGES, ARCHIVED, Language
 
 router = APIRouter(
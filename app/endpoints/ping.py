@@ -1,4 +1,21 @@
-from fastapi import APIRouter
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.db.models import User
+from app.dependencies import auth_dependency
+
+from app.utils.requests import (
+    get_judge0_pool_statistics,
+    get_judge0_breaker_statistics,
+    get_judge0_breaker_summary,
+)
+from app.utils.backpressure import get_dispatch_statistics
+from app.utils.auth import get_auth_statistics
+from app.utils.user_cache import get_user_cache_statistics
+from app.utils.rate_limit import get_auth_rate_limit_statistics
+from app.utils.result_queue import get_result_queue_statistics
+from app.workers.reconciler import reconciler_statistics
 
 
 router = APIRouter(prefix='/health_check')
@@ -9,4 +26,23 @@ router = APIRouter(prefix='/health_check')
     tags=['Healthcheck'],
 )
 async def ping():
-    return {'message': 'Application works'}
+    return {'message': 'Application works', 'judge0_breakers': get_judge0_breaker_summary()}
+
+
+@router.get(
+    '/metrics',
+    tags=['Healthcheck'],
+)
+async def metrics(user: Annotated[User, Depends(auth_dependency)]):
+    if not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    return {
+        'judge0_pool': get_judge0_pool_statistics(),
+        'judge0_breaker': get_judge0_breaker_statistics(),
+        'dispatch': await get_dispatch_statistics(),
+        'reconciler': dict(reconciler_statistics),
+        'result_queue': await get_result_queue_statistics(),
+        'auth': get_auth_statistics(),
+        'user_cache': get_user_cache_statistics(),
+        'auth_rate_limit': get_auth_rate_limit_statistics(),
+    }
@@ -6,11 +6,16 @@ from starlette import status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, func
 
-from app.schemas import PracticeIn, PracticeOut, Language, TestCaseOut, PaginationResult
+from app.schemas.practice import PracticeIn, PracticeOut
+from app.schemas.language import Language
+from app.schemas.testcase import TestCaseOut
+from app.schemas.pagination import PaginationResult
 from app.dependencies.pagination import pagination_dependency, Pagination
 from app.db import Practice, Course, User, get_session, TestCase
 from app.dependencies import auth_dependency
-from app.utils import practice_has_write_permission, practice_has_read_permission, is_participant
+from app.utils.practice import practice_has_write_permission, practice_has_read_permission
+from app.utils.course import is_participant
+from app.utils.verdict_cache import invalidate_verdicts
 from app.config.languages import ARCHIVED, LANGUAGES
 
 
@@ -70,6 +75,8 @@ async def get_practice(
                 command_line_args=practice.command_line_args,
                 network=practice.network,
                 allow_multi_file=practice.allow_multi_file,
+                execution_mode=practice.execution_mode,
+                fail_fast=practice.fail_fast,
                 testcases=[
                     TestCaseOut.model_validate(testcase)
                     for testcase in testcases
@@ -128,6 +135,8 @@ async def get_practice_list(
                         command_line_args=practice.command_line_args,
                         network=practice.network,
                         allow_multi_file=practice.allow_multi_file,
+                        execution_mode=practice.execution_mode,
+                        fail_fast=practice.fail_fast,
                         testcases=None
                     )
                     for practice in practices.unique()
@@ -184,6 +193,8 @@ async def create_practice(
                 command_line_args=new_practice.command_line_args,
                 network=new_practice.network,
                 allow_multi_file=new_practice.allow_multi_file,
+                execution_mode=new_practice.execution_mode,
+                fail_fast=new_practice.fail_fast,
                 testcases=[
                     TestCaseOut.model_validate(testcase)
                     for testcase in testcases
@@ -213,6 +224,7 @@ async def delete_practice(
         if await practice_has_write_permission(user, practice, session):
             await session.delete(practice)
             await session.commit()
+            await invalidate_verdicts(practice_id)
         else:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
     else:
@@ -266,6 +278,8 @@ async def edit_practice(
             session.add_all(testcases)
 
         await session.commit()
+        # Limits or testcases may be changed
+        await invalidate_verdicts(practice_id)
         return PracticeOut(
             id=practice.id,
             name=practice.name,
@@ -281,6 +295,8 @@ async def edit_practice(
             command_line_args=practice.command_line_args,
             network=practice.network,
             allow_multi_file=practice.allow_multi_file,
+            execution_mode=practice.execution_mode,
+            fail_fast=practice.fail_fast,
             testcases=[
                 TestCaseOut.model_validate(testcase)
                 for testcase in testcases
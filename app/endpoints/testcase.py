@@ -7,7 +7,8 @@ from sqlalchemy import select, delete
 
 from app.db import User, get_session, Practice, TestCase
 from app.dependencies import auth_dependency
-from app.schemas import TestCaseIn, TestCaseOut, TestCaseOutBrief
+from app.schemas.testcase import TestCaseIn, TestCaseOut, TestCaseOutBrief
+from app.utils.verdict_cache import invalidate_verdicts
 
 
 router = APIRouter(
@@ -76,6 +77,7 @@ async def delete_testcase(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
     await session.delete(testcase)
     await session.commit()
+    await invalidate_verdicts(testcase.practice_id)
 
 
 @router.post(
@@ -102,6 +104,7 @@ async def create_testcase(
     )
     session.add(testcase)
     await session.commit()
+    await invalidate_verdicts(practice.id)
     return TestCaseOut.model_validate(testcase)
 
 
@@ -124,4 +127,5 @@ async def update_testcase(
     for k, v in testcase_data.model_dump().items():
         setattr(testcase, k, v)
     await session.commit()
+    await invalidate_verdicts(testcase.practice_id)
     return TestCaseOut.model_validate(testcase)
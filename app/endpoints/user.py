@@ -6,7 +6,7 @@ from starlette import status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_session
-from app.schemas import UserIn, UserOut
+from app.schemas.user import UserIn, UserOut
 from app.dependencies import auth_dependency
 from app.db.models import User
 
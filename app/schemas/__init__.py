@@ -1,18 +0,0 @@
-from .user import UserOut, UserIn
-from .auth import AuthenticationIn, AuthenticationOut, PasswordUpdate, RegistrationRequest
-from .course import (
-    CourseIn,
-    CourseOut,
-    ParticipationOut,
-    ParticipationIn,
-    Summary,
-    CourseSearchResult,
-    ParticipationStatus,
-)
-from .practice import PracticeIn, PracticeOut
-from .language import Language
-from .attempt import AttemptIn, AttemptOut, AttemptSummary
-from .callback_server import CallbackRequestStatus, CallbackServerRequest
-from .testcase import TestCaseIn, TestCaseOut, TestCaseOutBrief
-from .image import ImageOut
-from .pagination import PaginationResult
@@ -2,12 +2,17 @@ from typing import Literal
 from uuid import UUID
 from datetime import datetime
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, field_validator
 
 from .language import Language
 from ..db import SubmissionStatus
 
 
+# Keys of Attempt.meta shown to users. Others hold internal dispatch and verdict cache state,
+# reused_from would tell that another student sent the same code
+PUBLIC_META_KEYS = frozenset()
+
+
 class AttemptIn(BaseModel):
     source_code: str
     language_id: int
@@ -21,9 +26,23 @@ class AttemptOut(BaseModel):
     author_id: UUID
     practice_id: UUID
     status: SubmissionStatus
+    # Number of completed tests by status
+    status_counts: dict[SubmissionStatus, int]
 
     model_config = ConfigDict(from_attributes=True)
 
+    @field_validator("meta")
+    @classmethod
+    def keep_public_meta(cls, meta: dict) -> dict:
+        return {key: value for key, value in meta.items() if key in PUBLIC_META_KEYS}
+
+
+class SubmissionOutputOut(BaseModel):
+    stdout: str | None
+    stderr: str | None
+    compile_output: str | None
+    message: str | None
+
 
 class AttemptSummary(BaseModel):
     user_id: UUID
@@ -9,7 +9,15 @@ class AuthenticationIn(BaseModel):
 
 
 class AuthenticationOut(BaseModel):
+    # Access token for "Authorization: Bearer" header
     token: str
+    refresh_token: str
+    # Access token lifetime, seconds
+    expires_in: int
+
+
+class RefreshIn(BaseModel):
+    refresh_token: str
 
 
 class PasswordUpdate(BaseModel):
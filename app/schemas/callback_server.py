@@ -12,8 +12,9 @@ class CallbackRequestStatus(BaseModel):
 
 class CallbackServerRequest(BaseModel):
     stdout: str | None
-    time: float
-    memory: int
+    # Not measured if program was not run (compilation error)
+    time: float | None
+    memory: int | None
     stderr: str | None
     token: UUID
     compile_output: str | None
@@ -5,6 +5,7 @@ from pydantic import BaseModel, Field, ConfigDict
 
 from .testcase import TestCaseIn, TestCaseOut
 from .language import Language
+from ..db import ExecutionMode
 
 
 class PracticeIn(BaseModel):
@@ -20,6 +21,8 @@ class PracticeIn(BaseModel):
     command_line_args: str = Field(max_length=512)
     network: bool
     allow_multi_file: bool
+    execution_mode: ExecutionMode = ExecutionMode.PER_TEST
+    fail_fast: bool = False
 
     testcases: list[TestCaseIn] | None
 
@@ -40,6 +43,8 @@ class PracticeOut(BaseModel):
     command_line_args: str = Field(max_length=512)
     network: bool
     allow_multi_file: bool
+    execution_mode: ExecutionMode
+    fail_fast: bool
 
     testcases: list[TestCaseOut] | None
 
@@ -1,4 +0,0 @@
-from .auth import authenticate, create_user
-from .course import get_course_permission, CoursePermission, is_participant
-from .practice import practice_has_write_permission, practice_has_read_permission
-from .requests import send_parallel_post
@@ -1,8 +1,44 @@
+import asyncio
+import hashlib
+import hmac
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from uuid import UUID
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import bcrypt
 
+from app.config import settings
 from app.db.models import User
+from .user_cache import get_cached_user_with_fingerprint, get_password_fingerprint
+from .rate_limit import reserve_auth_attempt, release_auth_attempt, record_auth_failure
+
+
+@dataclass
+class VerifiedCredentials:
+    user_id: UUID
+    # Fingerprint of password hash at verification time, changed password invalidates entry
+    password_fingerprint: str
+    expires_at: float
+
+
+# Keyed hash of Basic authorization header -> user with checked password, least recently used first
+verified_credentials: OrderedDict[bytes, VerifiedCredentials] = OrderedDict()
+auth_statistics = Counter()
+
+# bcrypt releases GIL, so hashing threads do not block event loop
+_password_executor: ThreadPoolExecutor | None = None
+# Jobs submitted to pool and not finished yet, decremented from hashing threads
+_password_jobs = 0
+_password_jobs_lock = threading.Lock()
+
+
+class PasswordHashingBusy(Exception):
+    """Too many passwords are waiting for hashing"""
 
 
 def hash_password(password: str) -> bytes:
@@ -13,14 +49,133 @@ def verify_password(password: str, hashed_password: bytes) -> bool:
     return bcrypt.checkpw(password.encode(), hashed_password)
 
 
-async def authenticate(username: str, password: str, session: AsyncSession) -> User | None:
+def get_password_executor() -> ThreadPoolExecutor:
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASHING_WORKERS,
+            thread_name_prefix="password-hashing",
+        )
+    return _password_executor
+
+
+def shutdown_password_executor() -> None:
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(cancel_futures=True)
+        _password_executor = None
+
+
+def finish_password_job(future) -> None:
+    global _password_jobs
+    with _password_jobs_lock:
+        _password_jobs -= 1
+
+
+async def run_password_job(function, *args):
+    """
+    Run bcrypt in hashing pool.
+    Job is counted until it finishes in pool, even if awaiting request was cancelled
+    :raise PasswordHashingBusy: if queue of waiting jobs is full
+    """
+    global _password_jobs
+    with _password_jobs_lock:
+        if _password_jobs >= settings.PASSWORD_HASHING_WORKERS + settings.PASSWORD_HASHING_QUEUE_LIMIT:
+            auth_statistics["rejected_password_jobs"] += 1
+            raise PasswordHashingBusy
+        _password_jobs += 1
+    future = get_password_executor().submit(function, *args)
+    future.add_done_callback(finish_password_job)
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(password: str) -> bytes:
+    return await run_password_job(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: bytes) -> bool:
+    return await run_password_job(verify_password, password, hashed_password)
+
+
+async def authenticate(
+        username: str,
+        password: str,
+        session: AsyncSession,
+        client_ip: str | None = None,
+) -> User | None:
+    """
+    :raise AuthRateLimited: if username or client made too many failed attempts, password is not checked
+    """
+    attempt_id = await reserve_auth_attempt(username, client_ip)
     probably_user = await session.scalar(select(User).filter_by(username=username))
-    if probably_user and verify_password(password, probably_user.password_hash):
+    try:
+        verified = probably_user is not None and await verify_password_async(password, probably_user.password_hash)
+    except PasswordHashingBusy:
+        await release_auth_attempt(username, client_ip, attempt_id)
+        raise
+    if verified:
+        await release_auth_attempt(username, client_ip, attempt_id)
         return probably_user
+    record_auth_failure()
+
+
+def get_credentials_key(authorization: str) -> bytes:
+    """Plaintext credentials are never kept in memory"""
+    return hmac.new(settings.AUTH_SECRET_KEY.encode(), authorization.encode(), hashlib.sha256).digest()
+
+
+def remember_credentials(key: bytes, user: User) -> None:
+    verified_credentials[key] = VerifiedCredentials(
+        user_id=user.id,
+        password_fingerprint=get_password_fingerprint(user.password_hash),
+        expires_at=time.monotonic() + settings.AUTH_CREDENTIALS_CACHE_TTL,
+    )
+    verified_credentials.move_to_end(key)
+    while len(verified_credentials) > settings.AUTH_CREDENTIALS_CACHE_SIZE:
+        verified_credentials.popitem(last=False)
+
+
+async def authenticate_basic(
+        authorization: str,
+        username: str,
+        password: str,
+        session: AsyncSession,
+        client_ip: str | None = None,
+) -> User | None:
+    """
+    Password of recently verified authorization header is not hashed again.
+    Cached entry is used only while user exists and has the same password hash fingerprint,
+    so password change and user deletion invalidate it in every process
+    """
+    key = get_credentials_key(authorization)
+    cached = verified_credentials.pop(key, None)
+    if cached is not None and cached.expires_at > time.monotonic():
+        user, fingerprint = await get_cached_user_with_fingerprint(session, cached.user_id)
+        if (
+                user is not None
+                and user.username == username
+                and hmac.compare_digest(fingerprint, cached.password_fingerprint)
+        ):
+            auth_statistics["credentials_cache_hits"] += 1
+            verified_credentials[key] = cached
+            return user
+    auth_statistics["credentials_cache_misses"] += 1
+    user = await authenticate(username=username, password=password, session=session, client_ip=client_ip)
+    if user is not None:
+        remember_credentials(key, user)
+    return user
+
+
+def get_auth_statistics() -> dict:
+    return {
+        "cached_credentials": len(verified_credentials),
+        "password_jobs": _password_jobs,
+        "password_queue": max(_password_jobs - settings.PASSWORD_HASHING_WORKERS, 0),
+    } | dict(auth_statistics)
 
 
 async def create_user(password: str, session: AsyncSession, **kwargs) -> User:
-    user = User(password_hash=hash_password(password), **kwargs)
+    user = User(password_hash=await hash_password_async(password), **kwargs)
     session.add(user)
     await session.commit()
     return user
@@ -0,0 +1,167 @@
+import asyncio
+from collections import Counter
+
+from app.config import settings, get_async_redis_client
+from .judge0 import probe_queue_size, get_judge0_nodes
+from .limiter import RedisSemaphore
+from .requests import get_judge0_client, get_judge0_breaker
+
+
+RUNNER_QUEUE_SIZE_KEY = "dispatch:runner_queue_size:{node}"
+DISPATCH_SLOTS_KEY = "dispatch:slots"
+# Cached probe result of unreachable node
+NODE_UNAVAILABLE = -1
+
+# Grow cached queue size only while it is cached, next probe gets the real value
+_ADD_TO_QUEUE_SIZE_SCRIPT = """
+local size = redis.call('GET', KEYS[1])
+if size and tonumber(size) >= 0 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+# Least loaded node with free capacity is picked and its queue size is grown in one step,
+# so concurrent dispatches spread over nodes. Only free capacity is reserved, queue never grows over limit.
+# Returns {1-based index of picked key, reserved count} or {0, 0}
+_RESERVE_NODE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local best, best_size
+for i, key in ipairs(KEYS) do
+    local size = tonumber(redis.call('GET', key))
+    if size and size >= 0 and size < limit and (best == nil or size < best_size) then
+        best, best_size = i, size
+    end
+end
+if best == nil then
+    return {0, 0}
+end
+local reserved = math.min(tonumber(ARGV[2]), limit - best_size)
+redis.call('INCRBY', KEYS[best], reserved)
+return {best, reserved}
+"""
+
+dispatch_statistics = Counter()
+
+_semaphore: RedisSemaphore | None = None
+
+
+def get_dispatch_semaphore() -> RedisSemaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = RedisSemaphore(
+            redis=get_async_redis_client(),
+            key=DISPATCH_SLOTS_KEY,
+            limit=settings.DISPATCH_MAX_CONCURRENCY,
+            lease_seconds=settings.DISPATCHER_LEASE_SECONDS,
+        )
+    return _semaphore
+
+
+async def acquire_dispatch_slot() -> str:
+    """
+    Wait for one of cluster-wide dispatch slots
+    :return: lease id for release
+    """
+    semaphore = get_dispatch_semaphore()
+    while (lease_id := await semaphore.acquire()) is None:
+        dispatch_statistics["slot_waits"] += 1
+        await asyncio.sleep(settings.DISPATCH_SLOT_WAIT)
+    return lease_id
+
+
+async def release_dispatch_slot(lease_id: str) -> None:
+    await get_dispatch_semaphore().release(lease_id)
+
+
+async def get_runner_queue_size(node: str) -> int | None:
+    """
+    Runner node queue depth, shared by all processes and probed at most once per probe interval
+    :return: None if node is unavailable
+    """
+    redis = get_async_redis_client()
+    key = RUNNER_QUEUE_SIZE_KEY.format(node=node)
+    cached = await redis.get(key)
+    if cached is None:
+        size = await probe_queue_size(get_judge0_client(), node)
+        cached = NODE_UNAVAILABLE if size is None else size
+        # Concurrent probe does not overwrite reservations made since the first one
+        await redis.set(key, cached, px=int(settings.DISPATCH_QUEUE_PROBE_INTERVAL * 1000), nx=True)
+    size = int(cached)
+    return None if size == NODE_UNAVAILABLE else size
+
+
+async def add_to_runner_queue_size(node: str, count: int) -> None:
+    """Account dispatched submissions before the next probe sees them, negative count releases reservation"""
+    redis = get_async_redis_client()
+    await redis.eval(_ADD_TO_QUEUE_SIZE_SCRIPT, 1, RUNNER_QUEUE_SIZE_KEY.format(node=node), count)
+
+
+async def get_available_nodes() -> dict[str, int]:
+    """
+    Healthy runner nodes with free queue capacity
+    :return: queue size by node
+    """
+    nodes = [node for node in get_judge0_nodes() if not get_judge0_breaker(node).is_open()]
+    sizes = await asyncio.gather(*(get_runner_queue_size(node) for node in nodes))
+    return {
+        node: size
+        for node, size in zip(nodes, sizes)
+        if size is not None and size < settings.DISPATCH_RUNNER_QUEUE_LIMIT
+    }
+
+
+async def get_runner_headroom() -> int:
+    """Number of submissions available runner nodes take before their queues reach the limit"""
+    sizes = await get_available_nodes()
+    headroom = sum(settings.DISPATCH_RUNNER_QUEUE_LIMIT - size for size in sizes.values())
+    if not headroom:
+        dispatch_statistics["throttled_rounds"] += 1
+    return headroom
+
+
+async def reserve_runner_node(count: int) -> tuple[str, int] | None:
+    """
+    Least loaded available runner node, up to count submissions are reserved in its queue at once,
+    so other attempts of the same round see them. Reservation is released if dispatch fails
+    :return: node and number of reserved submissions, it's less than count if node queue is almost full
+    """
+    nodes = list(await get_available_nodes())
+    if not nodes:
+        return None
+    picked, reserved = await get_async_redis_client().eval(
+        _RESERVE_NODE_SCRIPT,
+        len(nodes),
+        *(RUNNER_QUEUE_SIZE_KEY.format(node=node) for node in nodes),
+        settings.DISPATCH_RUNNER_QUEUE_LIMIT,
+        count,
+    )
+    return (nodes[picked - 1], reserved) if picked else None
+
+
+async def release_runner_node(node: str, count: int) -> None:
+    await add_to_runner_queue_size(node, -count)
+
+
+async def mark_runner_queue_full(node: str) -> None:
+    """Runner rejected submissions as overload: no dispatch to node until the next probe"""
+    await get_async_redis_client().set(
+        RUNNER_QUEUE_SIZE_KEY.format(node=node),
+        settings.DISPATCH_RUNNER_QUEUE_LIMIT,
+        xx=True,
+        keepttl=True,
+    )
+
+
+async def get_dispatch_statistics() -> dict:
+    redis = get_async_redis_client()
+    queue_sizes = {}
+    for node in get_judge0_nodes():
+        size = await redis.get(RUNNER_QUEUE_SIZE_KEY.format(node=node))
+        queue_sizes[node] = int(size) if size is not None and int(size) != NODE_UNAVAILABLE else None
+    return {
+        "slots_taken": await get_dispatch_semaphore().count(),
+        "slots_limit": settings.DISPATCH_MAX_CONCURRENCY,
+        "runner_queue_size": queue_sizes,
+        "runner_queue_limit": settings.DISPATCH_RUNNER_QUEUE_LIMIT,
+    } | dict(dispatch_statistics)
@@ -0,0 +1,172 @@
+from base64 import b64decode
+from uuid import UUID
+
+from httpx import AsyncClient, Response, HTTPError
+
+from app.config import settings
+from app.config.languages import LANGUAGES
+from app.db.models import Practice, TestCase
+from .requests import (
+    send_parallel_post,
+    send_batch_post,
+    send_request,
+    split_into_chunks,
+    RETRYABLE_STATUSES,
+)
+
+
+SUBMISSION_FIELDS = ("token", "status", "time", "memory", "stdout", "stderr", "compile_output", "message")
+# Output may be not valid UTF-8, so it is requested in base64
+BASE64_FIELDS = ("stdout", "stderr", "compile_output", "message")
+
+
+class RunnerQueueFull(Exception):
+    """Runner rejected submissions because its queue is full"""
+
+
+def get_judge0_nodes() -> list[str]:
+    """Base urls of runner nodes"""
+    if settings.JUDGE0_NODES:
+        return [node.strip().rstrip("/") for node in settings.JUDGE0_NODES.split(",") if node.strip()]
+    return [f"{settings.JUDGE0_HOST}:{settings.JUDGE0_PORT}"]
+
+
+def get_judge0_url(path: str, node: str | None = None) -> str:
+    return f"{node or get_judge0_nodes()[0]}{path}"
+
+
+def get_callback_url(path: str = "") -> str:
+    return f"{settings.CALLBACK_URL}:{settings.APP_PORT}{path}"
+
+
+def make_submission_payloads(
+        practice: Practice,
+        testcases: list[TestCase],
+        source_code: str,
+        language_id: int,
+        attempt_id: UUID,
+        dispatch_id: UUID,
+) -> list[dict]:
+    """
+    Judge0 submission body for every testcase.
+    Callback url identifies attempt, testcase and dispatch try, so result can be saved before its token
+    """
+    return [
+        {
+            "source_code": source_code,
+            "language_id": LANGUAGES[language_id].judge0id,
+            "memory_limit": practice.memory_limit,
+            "cpu_time_limit": practice.time_limit / 1000,
+            "expected_output": testcase.excepted,
+            "stdin": testcase.input,
+            "network": practice.network,
+            "max_threads": practice.max_threads,
+            "callback_url": get_callback_url(
+                f"/?attempt_id={attempt_id}&testcase_id={testcase.id}&dispatch_id={dispatch_id}"
+            ),
+        }
+        for testcase in testcases
+    ]
+
+
+def response_is_ok(response: Response) -> bool:
+    return response.status_code in (200, 201)
+
+
+def check_queue_is_not_full(responses: list[Response]) -> None:
+    """Overload statuses are left after retries: submissions must wait, not fail"""
+    if any(response.status_code in RETRYABLE_STATUSES for response in responses):
+        raise RunnerQueueFull
+
+
+async def create_submissions(
+        client: AsyncClient,
+        payloads: list[dict],
+        node: str | None = None,
+) -> list[str] | None:
+    """
+    Create Judge0 submissions on runner node, batched if enabled.
+    Tokens are known only to this node
+    :return: tokens in payloads order or None if runner is unavailable or rejected any submission
+    :raise RunnerQueueFull: if runner is still overloaded after retries
+    """
+    try:
+        return await _create_submissions(client, payloads, node)
+    except HTTPError:
+        return None
+
+
+async def _create_submissions(client: AsyncClient, payloads: list[dict], node: str | None) -> list[str] | None:
+    if not settings.JUDGE0_BATCHED_SUBMISSIONS:
+        responses = await send_parallel_post(
+            client=client,
+            url=get_judge0_url("/submissions", node),
+            jsons=payloads,
+        )
+        check_queue_is_not_full(responses)
+        if not all(response_is_ok(response) for response in responses):
+            return None
+        return [response.json()["token"] for response in responses]
+
+    responses = await send_batch_post(
+        client=client,
+        url=get_judge0_url("/submissions/batch", node),
+        jsons=payloads,
+        batch_size=settings.JUDGE0_MAX_BATCH_SIZE,
+    )
+    check_queue_is_not_full(responses)
+    if not all(response_is_ok(response) for response in responses):
+        return None
+    # Every batch item is either {"token": ...} or an object with validation errors
+    tokens = [item.get("token") for response in responses for item in response.json()]
+    if None in tokens:
+        return None
+    return tokens
+
+
+async def get_submissions(client: AsyncClient, tokens: list[str], node: str | None = None) -> list[dict] | None:
+    """
+    Current state of submissions on runner node, fetched by batches.
+    Text fields are decoded, so items have the same format as callback bodies
+    :return: submissions in tokens order (None for unknown token) or None if runner is unavailable
+    """
+    submissions = []
+    try:
+        for chunk in split_into_chunks(tokens, settings.JUDGE0_MAX_BATCH_SIZE):
+            response = await send_request(
+                client,
+                "GET",
+                get_judge0_url("/submissions/batch", node),
+                params={
+                    "tokens": ",".join(chunk),
+                    "base64_encoded": "true",
+                    "fields": ",".join(SUBMISSION_FIELDS),
+                },
+            )
+            if not response_is_ok(response):
+                return None
+            submissions.extend(response.json()["submissions"])
+    except HTTPError:
+        return None
+    for submission in submissions:
+        if submission is None:
+            continue
+        for field in BASE64_FIELDS:
+            if submission.get(field) is not None:
+                submission[field] = b64decode(submission[field]).decode(errors="replace")
+    return submissions
+
+
+async def probe_queue_size(client: AsyncClient, node: str | None = None) -> int | None:
+    """
+    Number of submissions waiting in runner node queues or None if node is unavailable.
+    Probe goes through circuit breaker, so unreachable node is not probed again until reset timeout
+    """
+    try:
+        # Next probe is soon anyway
+        response = await send_request(client, "GET", get_judge0_url("/workers", node), retries=0)
+    except HTTPError:
+        return None
+    if not response_is_ok(response):
+        return None
+    return sum(queue["size"] for queue in response.json())
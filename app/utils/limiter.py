@@ -0,0 +1,48 @@
+from time import time
+from uuid import uuid4
+
+from redis.asyncio import Redis
+
+
+# Drop expired leases, then take a free slot if any
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+
+class RedisSemaphore:
+    """
+    Counting semaphore shared by all processes using the same redis key.
+    Every slot is a lease, so slots of a crashed holder are freed after lease_seconds
+    """
+
+    def __init__(self, redis: Redis, key: str, limit: int, lease_seconds: float):
+        self.redis = redis
+        self.key = key
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+        self._acquire_script = redis.register_script(_ACQUIRE_SCRIPT)
+
+    async def acquire(self) -> str | None:
+        """
+        :return: lease id or None if all slots are taken
+        """
+        now = time()
+        lease_id = uuid4().hex
+        acquired = await self._acquire_script(
+            keys=[self.key],
+            args=[now, self.limit, now + self.lease_seconds, lease_id],
+        )
+        return lease_id if acquired else None
+
+    async def release(self, lease_id: str) -> None:
+        await self.redis.zrem(self.key, lease_id)
+
+    async def count(self) -> int:
+        """Number of taken slots (including expired, but not yet collected ones)"""
+        return await self.redis.zcard(self.key)
@@ -0,0 +1,109 @@
+import time
+from collections import Counter
+from functools import lru_cache
+from ipaddress import ip_address, ip_network, IPv4Network, IPv6Network
+from uuid import uuid4
+
+from redis.exceptions import RedisError
+from starlette.requests import Request
+
+from app.config import settings, get_async_redis_client
+
+
+auth_rate_limit_statistics = Counter()
+
+
+class AuthRateLimited(Exception):
+    """Too many failed password checks for username or client address"""
+
+
+@lru_cache
+def parse_trusted_proxies(trusted_proxies: str) -> tuple[IPv4Network | IPv6Network, ...]:
+    return tuple(ip_network(proxy.strip()) for proxy in trusted_proxies.split(",") if proxy.strip())
+
+
+def is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in parse_trusted_proxies(settings.TRUSTED_PROXIES))
+
+
+def get_client_ip(request: Request) -> str | None:
+    """Client address header is ignored unless request came through trusted proxy, so it can't be spoofed"""
+    peer = request.client.host if request.client else None
+    if (
+            settings.CLIENT_IP_HEADER
+            and request.headers.get(settings.CLIENT_IP_HEADER)
+            and peer is not None
+            and is_trusted_proxy(peer)
+    ):
+        return request.headers[settings.CLIENT_IP_HEADER]
+    return peer
+
+
+def get_rate_limit_keys(username: str, client_ip: str | None) -> dict[str, tuple[str, int]]:
+    """
+    :return: limited subject -> (sorted set of failure times, limit)
+    """
+    keys = {"username": (f"auth:failures:user:{username}", settings.AUTH_RATE_LIMIT_PER_USERNAME)}
+    if client_ip:
+        keys["ip"] = (f"auth:failures:ip:{client_ip}", settings.AUTH_RATE_LIMIT_PER_IP)
+    return keys
+
+
+async def reserve_auth_attempt(username: str, client_ip: str | None) -> str | None:
+    """
+    Called before hashing password, costs one Redis round trip.
+    Attempt is counted as failure up front and checked in the same transaction,
+    so concurrent requests can't all pass the limit before any failure is recorded.
+    Limiter fails open: password is checked if Redis is unavailable
+    :return: attempt id to pass to release_auth_attempt, None if limiter is off or unavailable
+    :raise AuthRateLimited: if failures in sliding window reached limit
+    """
+    if not settings.AUTH_RATE_LIMIT_ENABLED:
+        return None
+    keys = get_rate_limit_keys(username, client_ip)
+    attempt_id = uuid4().hex
+    now = time.time()
+    try:
+        async with get_async_redis_client().pipeline(transaction=True) as pipeline:
+            for key, _ in keys.values():
+                pipeline.zremrangebyscore(key, 0, now - settings.AUTH_RATE_LIMIT_WINDOW)
+                pipeline.zadd(key, {attempt_id: now})
+                pipeline.zcard(key)
+                pipeline.expire(key, settings.AUTH_RATE_LIMIT_WINDOW)
+            counts = (await pipeline.execute())[2::4]
+    except RedisError:
+        auth_rate_limit_statistics["unavailable"] += 1
+        return None
+    for (subject, (_, limit)), count in zip(keys.items(), counts):
+        if count > limit:
+            auth_rate_limit_statistics[f"rejected_by_{subject}"] += 1
+            # Rejected attempt does not check password, so it does not prolong the limit
+            await release_auth_attempt(username, client_ip, attempt_id)
+            raise AuthRateLimited
+    return attempt_id
+
+
+async def release_auth_attempt(username: str, client_ip: str | None, attempt_id: str | None) -> None:
+    """Successful attempt or one that didn't check password is not counted as failure"""
+    if attempt_id is None:
+        return
+    try:
+        async with get_async_redis_client().pipeline(transaction=False) as pipeline:
+            for key, _ in get_rate_limit_keys(username, client_ip).values():
+                pipeline.zrem(key, attempt_id)
+            await pipeline.execute()
+    except RedisError:
+        auth_rate_limit_statistics["unavailable"] += 1
+
+
+def record_auth_failure() -> None:
+    """Failed attempt is already in sliding window since its reservation"""
+    auth_rate_limit_statistics["failures"] += 1
+
+
+def get_auth_rate_limit_statistics() -> dict:
+    return dict(auth_rate_limit_statistics)
@@ -1,18 +1,302 @@
-from asyncio import as_completed
+from asyncio import gather, sleep
+from collections import Counter
+from random import uniform
+from time import monotonic
 
-from httpx import AsyncClient, Response
+from httpx import (
+    URL,
+    AsyncClient,
+    AsyncHTTPTransport,
+    Limits,
+    Request,
+    Response,
+    Timeout,
+    HTTPError,
+    ConnectError,
+    ConnectTimeout,
+    PoolTimeout,
+)
 
+from app.config import settings
 
-async def send_post(client: AsyncClient, url: str, json: dict) -> Response:
-    return await client.post(
-        url=url,
-        json=json,
+
+# Request was not sent, so retry can't duplicate submission
+RETRYABLE_ERRORS = (ConnectError, ConnectTimeout, PoolTimeout)
+# Runner rejected request as overload (queue is full)
+RETRYABLE_STATUSES = (429, 503)
+
+
+class CircuitOpenError(HTTPError):
+    """Request was not sent because runner is considered unavailable"""
+
+
+class CircuitBreaker:
+    """
+    Stops requests to failing runner.
+    Closed: requests pass, consecutive failures are counted.
+    Open: requests are rejected until reset timeout expires.
+    Half open: one trial request passes, its result closes or reopens the circuit
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.opened_total = 0
+        self.rejected_total = 0
+
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and monotonic() - self.opened_at < self.reset_timeout
+
+    def allow_request(self) -> bool:
+        if self.state == self.OPEN:
+            if self.is_open():
+                self.rejected_total += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.trial_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self.trial_in_flight:
+                self.rejected_total += 1
+                return False
+            self.trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened_total += 1
+            self.state = self.OPEN
+            self.opened_at = monotonic()
+
+    def release_trial(self) -> None:
+        """Trial ended without result (e.g. cancelled), next request becomes the trial"""
+        self.trial_in_flight = False
+
+    def get_statistics(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+        }
+
+
+# Breaker of every runner node by host:port
+judge0_breakers: dict[str, CircuitBreaker] = {}
+retry_statistics = Counter()
+
+
+def get_judge0_breaker(url: str) -> CircuitBreaker:
+    """Breaker of runner node serving url"""
+    node = URL(url).netloc.decode()
+    if node not in judge0_breakers:
+        judge0_breakers[node] = CircuitBreaker(
+            failure_threshold=settings.JUDGE0_BREAKER_FAILURES,
+            reset_timeout=settings.JUDGE0_BREAKER_RESET_TIMEOUT,
+        )
+    return judge0_breakers[node]
+
+
+class PoolStatisticsTransport(AsyncHTTPTransport):
+    """
+    HTTP transport that counts requests passing through its connection pool
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle_async_request(self, request: Request) -> Response:
+        self.requests_total += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def get_statistics(self) -> dict:
+        connections = self._pool.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "max_connections": settings.JUDGE0_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.JUDGE0_MAX_KEEPALIVE_CONNECTIONS,
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+_judge0_client: AsyncClient | None = None
+# Transport of _judge0_client, kept for pool statistics
+_judge0_transport: PoolStatisticsTransport | None = None
+
+
+def create_judge0_transport() -> PoolStatisticsTransport:
+    return PoolStatisticsTransport(
+        limits=Limits(
+            max_connections=settings.JUDGE0_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.JUDGE0_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.JUDGE0_KEEPALIVE_EXPIRY,
+        ),
     )
 
 
+def create_judge0_client(transport: PoolStatisticsTransport) -> AsyncClient:
+    return AsyncClient(
+        transport=transport,
+        timeout=Timeout(
+            settings.JUDGE0_TIMEOUT,
+            connect=settings.JUDGE0_CONNECT_TIMEOUT,
+        ),
+    )
+
+
+def get_judge0_client() -> AsyncClient:
+    """Process-wide Judge0 client, lazy loading if app lifespan was not started"""
+    global _judge0_client, _judge0_transport
+    if _judge0_client is None or _judge0_client.is_closed:
+        _judge0_transport = create_judge0_transport()
+        _judge0_client = create_judge0_client(_judge0_transport)
+    return _judge0_client
+
+
+async def open_judge0_client() -> AsyncClient:
+    return get_judge0_client()
+
+
+async def close_judge0_client() -> None:
+    global _judge0_client, _judge0_transport
+    if _judge0_client is not None:
+        await _judge0_client.aclose()
+        _judge0_client = None
+        _judge0_transport = None
+
+
+def get_judge0_pool_statistics() -> dict:
+    if _judge0_transport is None:
+        return {}
+    return _judge0_transport.get_statistics()
+
+
+def get_judge0_breaker_summary() -> dict[str, int]:
+    """Public health of runner nodes, without their internal addresses"""
+    return {
+        "open": sum(breaker.state != CircuitBreaker.CLOSED for breaker in judge0_breakers.values()),
+        "total": len(judge0_breakers),
+    }
+
+
+def get_judge0_breaker_statistics() -> dict:
+    return {
+        "nodes": {node: breaker.get_statistics() for node, breaker in judge0_breakers.items()},
+        "retries_total": retry_statistics["retries"],
+    }
+
+
+def get_retry_delay(retry: int) -> float:
+    """Exponential backoff with full jitter, so failed requests are not retried all at once"""
+    return uniform(0, min(settings.JUDGE0_RETRY_MAX_DELAY, settings.JUDGE0_RETRY_BASE_DELAY * 2 ** retry))
+
+
+async def send_post(client: AsyncClient, url: str, json: dict) -> Response:
+    return await send_request(client, "POST", url, json=json)
+
+
+async def send_request(
+        client: AsyncClient,
+        method: str,
+        url: str,
+        retries: int | None = None,
+        **kwargs,
+) -> Response:
+    """
+    Request through circuit breaker of runner node, transient failures are retried
+    :param retries: JUDGE0_RETRIES by default
+    :raise CircuitOpenError: if runner node is considered unavailable
+    """
+    judge0_breaker = get_judge0_breaker(url)
+    retries = settings.JUDGE0_RETRIES if retries is None else retries
+    for retry in range(retries + 1):
+        is_last = retry == retries
+        if not judge0_breaker.allow_request():
+            raise CircuitOpenError(f"Circuit is open, request to {url} is not sent")
+        is_trial = judge0_breaker.state == CircuitBreaker.HALF_OPEN
+        try:
+            response = await client.request(method, url, **kwargs)
+        except RETRYABLE_ERRORS:
+            judge0_breaker.record_failure()
+            if is_last:
+                raise
+        except HTTPError:
+            judge0_breaker.record_failure()
+            raise
+        else:
+            if response.status_code not in RETRYABLE_STATUSES:
+                if response.status_code >= 500:
+                    judge0_breaker.record_failure()
+                else:
+                    judge0_breaker.record_success()
+                return response
+            # Overloaded runner is alive, its full queue is backpressure and does not open circuit
+            if is_last:
+                return response
+        finally:
+            if is_trial:
+                judge0_breaker.release_trial()
+        retry_statistics["retries"] += 1
+        await sleep(get_retry_delay(retry))
+
+
 async def send_parallel_post(client: AsyncClient, url: str, jsons: list[dict]) -> list[Response]:
-    result = []
+    """
+    Send one POST per json, responses are returned in jsons order
+    """
     task_list = [send_post(client, url, json) for json in jsons]
-    for task in as_completed(task_list):
-        result.append(await task)
-    return result
+    return list(await gather(*task_list))
+
+
+def split_into_chunks(items: list, chunk_size: int) -> list[list]:
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+async def send_batch_post(
+        client: AsyncClient,
+        url: str,
+        jsons: list[dict],
+        batch_size: int,
+        key: str = "submissions",
+) -> list[Response]:
+    """
+    Pack jsons into `{key: [...]}` bodies of at most batch_size items and send them in parallel,
+    responses are returned in chunks order
+    """
+    task_list = [
+        send_post(client, url, {key: chunk})
+        for chunk in split_into_chunks(jsons, batch_size)
+    ]
+    return list(await gather(*task_list))
@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from uuid import UUID
+
+from pydantic import ValidationError
+from redis.exceptions import ResponseError
+
+from app.config import settings, get_async_redis_client
+from app.schemas.callback_server import CallbackServerRequest
+
+
+RESULT_STREAM_KEY = "callback:results"
+RESULT_GROUP = "result-appliers"
+
+
+@dataclass
+class QueuedResult:
+    id: str
+    result: CallbackServerRequest | None
+    attempt_id: UUID | None
+    testcase_id: int | None
+    dispatch_id: UUID | None
+
+    @property
+    def queued_at(self) -> float:
+        """Stream entry id starts with time of adding in milliseconds"""
+        return int(self.id.split("-")[0]) / 1000
+
+
+async def enqueue_result(
+        result: CallbackServerRequest,
+        attempt_id: UUID | None,
+        testcase_id: int | None,
+        dispatch_id: UUID | None,
+) -> None:
+    """Durably save runner result for result appliers"""
+    fields = {"result": result.model_dump_json()}
+    if attempt_id is not None and testcase_id is not None and dispatch_id is not None:
+        fields |= {"attempt_id": str(attempt_id), "testcase_id": testcase_id, "dispatch_id": str(dispatch_id)}
+    await get_async_redis_client().xadd(RESULT_STREAM_KEY, fields)
+
+
+async def create_result_group() -> None:
+    try:
+        await get_async_redis_client().xgroup_create(RESULT_STREAM_KEY, RESULT_GROUP, id="0", mkstream=True)
+    except ResponseError as error:
+        # Group is created by another applier
+        if "BUSYGROUP" not in str(error):
+            raise
+
+
+def parse_entry(entry_id: bytes, fields: dict) -> QueuedResult:
+    """Broken entry gets None result"""
+    try:
+        result = CallbackServerRequest.model_validate_json(fields[b"result"])
+    except (KeyError, ValidationError):
+        result = None
+    attempt_id = fields.get(b"attempt_id")
+    testcase_id = fields.get(b"testcase_id")
+    dispatch_id = fields.get(b"dispatch_id")
+    return QueuedResult(
+        id=entry_id.decode(),
+        result=result,
+        attempt_id=UUID(attempt_id.decode()) if attempt_id else None,
+        testcase_id=int(testcase_id) if testcase_id else None,
+        dispatch_id=UUID(dispatch_id.decode()) if dispatch_id else None,
+    )
+
+
+async def read_results(consumer: str) -> list[QueuedResult]:
+    """Next micro-batch of new results"""
+    response = await get_async_redis_client().xreadgroup(
+        RESULT_GROUP,
+        consumer,
+        {RESULT_STREAM_KEY: ">"},
+        count=settings.CALLBACK_BATCH_SIZE,
+        block=int(settings.CALLBACK_BATCH_WAIT * 1000),
+    )
+    return [parse_entry(entry_id, fields) for _, entries in response for entry_id, fields in entries]
+
+
+async def claim_stale_results(consumer: str) -> list[QueuedResult]:
+    """Results taken but not acknowledged for retry interval"""
+    _, entries, *_ = await get_async_redis_client().xautoclaim(
+        RESULT_STREAM_KEY,
+        RESULT_GROUP,
+        consumer,
+        min_idle_time=int(settings.CALLBACK_QUEUE_RETRY_AFTER * 1000),
+        count=settings.CALLBACK_BATCH_SIZE,
+    )
+    return [parse_entry(entry_id, fields) for entry_id, fields in entries if fields]
+
+
+async def acknowledge_results(ids: list[str]) -> None:
+    """Remove applied results from stream"""
+    if not ids:
+        return
+    async with get_async_redis_client().pipeline(transaction=False) as pipe:
+        pipe.xack(RESULT_STREAM_KEY, RESULT_GROUP, *ids)
+        pipe.xdel(RESULT_STREAM_KEY, *ids)
+        await pipe.execute()
+
+
+async def get_result_queue_statistics() -> dict:
+    redis = get_async_redis_client()
+    try:
+        pending = await redis.xpending(RESULT_STREAM_KEY, RESULT_GROUP)
+    except ResponseError:
+        # Stream is not created yet
+        return {"length": 0, "pending": 0}
+    return {
+        "length": await redis.xlen(RESULT_STREAM_KEY),
+        "pending": pending["pending"],
+    }
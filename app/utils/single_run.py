@@ -0,0 +1,161 @@
+from base64 import b64encode, b64decode
+from dataclasses import dataclass
+from io import BytesIO
+from zipfile import ZipFile, ZIP_DEFLATED
+
+from app.config import settings
+from app.config.languages import LANGUAGES, MULTI_FILE_JUDGE0_ID
+from app.db.models import Practice, TestCase, SubmissionStatus
+
+
+# Exit codes of timeout: program was terminated or, ignoring SIGTERM, killed
+TIMEOUT_EXIT_CODES = (124, 137)
+
+# Runs student program once per test in testcase order.
+# Program can reach every file of the box, so the harness keeps inputs, outputs and results in memory:
+# tests are read and removed before the first run, output goes through a pipe, results are printed
+# after all runs and tagged by per-run marker, that is removed before the first run too.
+# Time is CPU time of program, processes left by it are killed before the next test
+RUN_SCRIPT = """#!/bin/bash
+marker=$(cat marker)
+rm -f marker
+ids=$(ls tests | sed 's/\\.in$//' | sort -n)
+declare -A inputs
+for id in $ids; do
+    input=$(cat "tests/$id.in"; printf x)
+    inputs[$id]=${{input%x}}
+done
+rm -rf tests
+results=()
+TIMEFORMAT="%3U %3S"
+for id in $ids; do
+    {{ time {{
+        output=$(printf '%s' "${{inputs[$id]}}" | timeout -k 1 {time_limit} {run_cmd} 2> /dev/null | base64 -w0; exit ${{PIPESTATUS[1]}})
+        code=$?
+    }}; }} 2> cpu_time
+    {kill}
+    read user system < cpu_time
+    results+=("$marker $id $code $(( 10#${{user/./}} + 10#${{system/./}} )) $output")
+{stop}done
+printf '%s\\n' "${{results[@]}}"
+"""
+# Box has its own PID namespace, so only processes of the program are killed
+KILL_LEFTOVERS = "kill -9 -1 2> /dev/null"
+# Fail fast: crashed or timed out program is not run on next tests
+FAIL_FAST_STOP = "    if [ $code -ne 0 ]; then break; fi\n"
+
+
+@dataclass
+class TestResult:
+    exit_code: int
+    time: int
+    output: str
+
+
+def get_single_run_cpu_time_limit(practice: Practice, testcases: list[TestCase]) -> float:
+    return practice.time_limit * len(testcases) / 1000 + settings.SINGLE_RUN_EXTRA_TIME
+
+
+def fits_single_run(practice: Practice, testcases: list[TestCase]) -> bool:
+    """Whole attempt must fit into runner maximal time limits"""
+    return bool(testcases) and (
+        get_single_run_cpu_time_limit(practice, testcases) <= settings.JUDGE0_MAX_CPU_TIME_LIMIT
+    )
+
+
+def make_harness_archive(
+        practice: Practice,
+        testcases: list[TestCase],
+        source_code: str,
+        language_id: int,
+        marker: str,
+) -> bytes:
+    language = LANGUAGES[language_id]
+    archive = BytesIO()
+    with ZipFile(archive, "w", ZIP_DEFLATED) as zip_file:
+        zip_file.writestr(language.source_file, source_code)
+        if language.compile_cmd:
+            zip_file.writestr("compile", f"#!/bin/bash\n{language.compile_cmd}\n")
+        zip_file.writestr(
+            "run",
+            RUN_SCRIPT.format(
+                time_limit=practice.time_limit / 1000,
+                run_cmd=language.run_cmd,
+                kill=KILL_LEFTOVERS,
+                stop=FAIL_FAST_STOP if practice.fail_fast else "",
+            ),
+        )
+        zip_file.writestr("marker", marker)
+        for testcase in testcases:
+            zip_file.writestr(f"tests/{testcase.id}.in", testcase.input)
+    return archive.getvalue()
+
+
+def make_single_run_payload(
+        practice: Practice,
+        testcases: list[TestCase],
+        source_code: str,
+        language_id: int,
+        callback_url: str,
+        marker: str,
+) -> dict:
+    """
+    Judge0 multi-file submission, that compiles program once and runs it on every testcase
+    :param marker: secret tag of result lines, program output can't forge them
+    """
+    cpu_time_limit = get_single_run_cpu_time_limit(practice, testcases)
+    archive = make_harness_archive(practice, testcases, source_code, language_id, marker)
+    return {
+        "language_id": MULTI_FILE_JUDGE0_ID,
+        "additional_files": b64encode(archive).decode(),
+        "memory_limit": practice.memory_limit,
+        "cpu_time_limit": cpu_time_limit,
+        "wall_time_limit": min(cpu_time_limit * 2, settings.JUDGE0_MAX_WALL_TIME_LIMIT),
+        "network": practice.network,
+        "callback_url": callback_url,
+    }
+
+
+def parse_single_run_output(stdout: str | None, marker: str) -> dict[int, TestResult]:
+    """
+    Only the first line of every test is used
+    :param marker: marker of the run
+    :return: results of finished tests by testcase id
+    """
+    results = {}
+    for line in (stdout or "").splitlines():
+        parts = line.split(" ")
+        if len(parts) != 5 or parts[0] != marker:
+            continue
+        try:
+            testcase_id, exit_code, time = int(parts[1]), int(parts[2]), int(parts[3])
+            output = b64decode(parts[4]).decode(errors="replace")
+        except ValueError:
+            continue
+        if testcase_id in results:
+            continue
+        results[testcase_id] = TestResult(exit_code=exit_code, time=time, output=output)
+    return results
+
+
+def skip_after_failure(statuses: list[SubmissionStatus]) -> list[SubmissionStatus]:
+    """Fail fast: tests after first failed one are skipped"""
+    for i, status in enumerate(statuses):
+        if status != SubmissionStatus.ACCEPTED:
+            return statuses[:i + 1] + [SubmissionStatus.SKIPPED] * (len(statuses) - i - 1)
+    return statuses
+
+
+def normalize_output(output: str) -> str:
+    """Same comparison rules as Judge0: trailing spaces and surrounding blank lines are ignored"""
+    return "\n".join(line.rstrip() for line in output.split("\n")).strip()
+
+
+def get_test_status(result: TestResult, excepted: str) -> SubmissionStatus:
+    if result.exit_code in TIMEOUT_EXIT_CODES:
+        return SubmissionStatus.TIME_LIMIT_EXCEED
+    if result.exit_code != 0:
+        return SubmissionStatus.RUNTIME_ERROR
+    if normalize_output(result.output) != normalize_output(excepted):
+        return SubmissionStatus.WRONG_ANSWER
+    return SubmissionStatus.ACCEPTED
@@ -0,0 +1,95 @@
+import zlib
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models import SubmissionOutput
+from app.schemas.callback_server import CallbackServerRequest
+
+
+OUTPUT_FIELDS = ("stdout", "stderr", "compile_output", "message")
+TRUNCATION_MARKER = "\n... {size} bytes truncated ...\n"
+TEXT_TRUNCATION_MARKER = "\n... {size} characters truncated ...\n"
+
+
+def truncate_text(output: str, max_length: int) -> str:
+    """Keep head and tail of long text without encoding it"""
+    if len(output) <= max_length:
+        return output
+    head = max_length // 2
+    tail = max_length - head
+    return output[:head] + TEXT_TRUNCATION_MARKER.format(size=len(output) - max_length) + output[len(output) - tail:]
+
+
+def truncate_output(output: str, max_size: int) -> bytes:
+    """
+    Keep head and tail of long output, middle part is replaced with marker
+    :return: UTF-8 encoded output not longer than max_size (plus marker)
+    """
+    data = output.encode(errors="replace")
+    if len(data) <= max_size:
+        return data
+    head = max_size // 2
+    tail = max_size - head
+    marker = TRUNCATION_MARKER.format(size=len(data) - max_size).encode()
+    return data[:head] + marker + data[len(data) - tail:]
+
+
+def compress_output(output: str | None) -> bytes | None:
+    if not output:
+        return None
+    return zlib.compress(
+        truncate_output(output, settings.SUBMISSION_OUTPUT_MAX_SIZE),
+        settings.SUBMISSION_OUTPUT_COMPRESSION_LEVEL,
+    )
+
+
+def decompress_output(data: bytes | None) -> str | None:
+    if data is None:
+        return None
+    # Truncation may cut multibyte character
+    return zlib.decompress(data).decode(errors="replace")
+
+
+def make_output_row(token: UUID, outputs: dict[str, str | None]) -> dict | None:
+    """
+    :param outputs: text of OUTPUT_FIELDS, missing ones are not stored
+    :return: submission_output row, None if there is no output or it is not stored
+    """
+    if not settings.SUBMISSION_OUTPUT_ENABLED:
+        return None
+    row = {field: compress_output(outputs.get(field)) for field in OUTPUT_FIELDS}
+    if not any(row.values()):
+        return None
+    return row | {"token": token}
+
+
+def make_result_output_row(result: CallbackServerRequest) -> dict | None:
+    return make_output_row(result.token, {field: getattr(result, field) for field in OUTPUT_FIELDS})
+
+
+async def save_outputs(session: AsyncSession, rows: list[dict | None]) -> None:
+    """
+    Store output of saved submissions, output of repeated result is ignored
+    """
+    rows = [row for row in rows if row is not None]
+    if not rows:
+        return
+    await session.execute(
+        insert(SubmissionOutput).
+        values(rows).
+        on_conflict_do_nothing(index_elements=[SubmissionOutput.token])
+    )
+
+
+async def load_output(session: AsyncSession, token: UUID) -> dict[str, str | None]:
+    """
+    :return: decompressed OUTPUT_FIELDS of submission (None if not stored)
+    """
+    output = await session.get(SubmissionOutput, token)
+    return {
+        field: decompress_output(getattr(output, field)) if output else None
+        for field in OUTPUT_FIELDS
+    }
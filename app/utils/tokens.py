@@ -0,0 +1,101 @@
+import hashlib
+import hmac
+import json
+import time
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from uuid import UUID, uuid4
+
+from app.config import settings, get_async_redis_client
+
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+# Logged out session, kept while its refresh token may be valid
+REVOKED_SESSION_KEY = "auth:revoked_session:{session_id}"
+# Refresh token is exchanged once, its reuse revokes the whole session
+USED_REFRESH_TOKEN_KEY = "auth:used_refresh:{token_id}"
+
+
+def b64encode(data: bytes) -> str:
+    return urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def b64decode(data: str) -> bytes:
+    return urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign(payload: str) -> bytes:
+    return hmac.new(settings.AUTH_SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest()
+
+
+def encode_token(claims: dict) -> str:
+    payload = b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{b64encode(sign(payload))}"
+
+
+def decode_token(token: str, token_type: str) -> dict | None:
+    """
+    Verify signature and expiration time of token
+    :return: claims, None if token is invalid, expired or has another type
+    """
+    payload, _, signature = token.partition(".")
+    try:
+        if not hmac.compare_digest(b64decode(signature), sign(payload)):
+            return None
+        claims = json.loads(b64decode(payload))
+    except ValueError:
+        return None
+    if not isinstance(claims, dict) or claims.get("typ") != token_type:
+        return None
+    if not isinstance(claims.get("exp"), int) or claims["exp"] < time.time():
+        return None
+    return claims
+
+
+def issue_tokens(user_id: UUID, session_id: str | None = None) -> tuple[str, str]:
+    """
+    Short-lived access token and refresh token of login session
+    :param session_id: session of refreshed tokens, new session if None
+    :return: access token, refresh token
+    """
+    session_id = session_id or uuid4().hex
+    now = int(time.time())
+    claims = {"sub": str(user_id), "sid": session_id}
+    access_token = encode_token(claims | {"typ": ACCESS_TOKEN, "exp": now + settings.ACCESS_TOKEN_TTL})
+    refresh_token = encode_token(
+        claims | {"typ": REFRESH_TOKEN, "jti": uuid4().hex, "exp": now + settings.REFRESH_TOKEN_TTL}
+    )
+    return access_token, refresh_token
+
+
+async def revoke_session(session_id: str) -> None:
+    await get_async_redis_client().set(
+        REVOKED_SESSION_KEY.format(session_id=session_id),
+        1,
+        ex=settings.REFRESH_TOKEN_TTL,
+    )
+
+
+async def session_is_revoked(session_id: str) -> bool:
+    return bool(await get_async_redis_client().exists(REVOKED_SESSION_KEY.format(session_id=session_id)))
+
+
+async def use_refresh_token(claims: dict) -> bool:
+    """
+    Mark refresh token as exchanged.
+    Reused token was probably stolen, so its session is revoked
+    :return: False if token was already used or its session is revoked
+    """
+    if await session_is_revoked(claims["sid"]):
+        return False
+    first_use = await get_async_redis_client().set(
+        USED_REFRESH_TOKEN_KEY.format(token_id=claims["jti"]),
+        1,
+        ex=max(int(claims["exp"] - time.time()), 1),
+        nx=True,
+    )
+    if not first_use:
+        await revoke_session(claims["sid"])
+        return False
+    return True
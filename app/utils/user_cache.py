@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from collections import Counter, OrderedDict
+from uuid import UUID
+
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.config import settings, get_async_redis_client
+from app.db.models import User
+
+
+# Password hash is not cached, only its keyed fingerprint detecting password change
+USER_CACHE_FIELDS = ("username", "display_name", "is_teacher", "is_admin", "email")
+# Session info key of users changed in transaction
+CHANGED_USERS = "changed_users"
+
+# User id -> (expiration time, cached columns), least recently used first
+_local_users: OrderedDict[UUID, tuple[float, dict]] = OrderedDict()
+_invalidations: set[asyncio.Task] = set()
+user_cache_statistics = Counter()
+
+
+def get_user_cache_key(user_id: UUID) -> str:
+    return f"auth:user:{user_id}"
+
+
+def get_password_fingerprint(password_hash: bytes) -> str:
+    """Keyed hash of password hash, useless for offline password guessing"""
+    return hmac.new(settings.AUTH_SECRET_KEY.encode(), password_hash, hashlib.sha256).hexdigest()
+
+
+def dump_user(user: User) -> dict:
+    return {field: getattr(user, field) for field in USER_CACHE_FIELDS} | {
+        "password_fingerprint": get_password_fingerprint(user.password_hash),
+    }
+
+
+def load_user(user_id: UUID, data: dict) -> User:
+    return User(id=user_id, **{field: data[field] for field in USER_CACHE_FIELDS})
+
+
+def remember_local_user(user_id: UUID, data: dict) -> None:
+    _local_users[user_id] = (time.monotonic() + settings.USER_CACHE_LOCAL_TTL, data)
+    _local_users.move_to_end(user_id)
+    while len(_local_users) > settings.USER_CACHE_LOCAL_SIZE:
+        _local_users.popitem(last=False)
+
+
+def get_local_user(user_id: UUID) -> dict | None:
+    cached = _local_users.get(user_id)
+    if cached is None:
+        return None
+    expires_at, data = cached
+    if expires_at <= time.monotonic():
+        del _local_users[user_id]
+        return None
+    _local_users.move_to_end(user_id)
+    return data
+
+
+async def get_redis_user(user_id: UUID) -> dict | None:
+    try:
+        data = await get_async_redis_client().get(get_user_cache_key(user_id))
+    except RedisError:
+        return None
+    data = json.loads(data) if data else None
+    # Entry of older format
+    if data is not None and "password_fingerprint" not in data:
+        return None
+    return data
+
+
+async def store_redis_user(user_id: UUID, data: dict) -> None:
+    try:
+        await get_async_redis_client().set(get_user_cache_key(user_id), json.dumps(data), ex=settings.USER_CACHE_TTL)
+    except RedisError:
+        pass
+
+
+async def get_cached_user(session: AsyncSession, user_id: UUID) -> User | None:
+    user, _ = await get_cached_user_with_fingerprint(session, user_id)
+    return user
+
+
+async def get_cached_user_with_fingerprint(session: AsyncSession, user_id: UUID) -> tuple[User | None, str | None]:
+    """
+    User of authenticated request from process memory or Redis, database is queried on miss.
+    Cached user is attached to session without loading, like one fetched by session.get,
+    its password hash is not loaded
+    :return: user and fingerprint of its password hash
+    """
+    if not settings.USER_CACHE_ENABLED:
+        user = await session.get(User, user_id)
+        return user, get_password_fingerprint(user.password_hash) if user is not None else None
+    data = get_local_user(user_id)
+    if data is None:
+        data = await get_redis_user(user_id)
+        if data is None:
+            user_cache_statistics["misses"] += 1
+            user = await session.get(User, user_id)
+            if user is None:
+                return None, None
+            data = dump_user(user)
+            remember_local_user(user_id, data)
+            await store_redis_user(user_id, data)
+            return user, data["password_fingerprint"]
+        remember_local_user(user_id, data)
+    user_cache_statistics["hits"] += 1
+    user = load_user(user_id, data)
+    make_transient_to_detached(user)
+    return await session.merge(user, load=False), data["password_fingerprint"]
+
+
+async def invalidate_cached_users(user_ids: set[UUID]) -> None:
+    """
+    Called after commit of changed or deleted users.
+    Other processes may keep their in-process copy for USER_CACHE_LOCAL_TTL
+    """
+    for user_id in user_ids:
+        _local_users.pop(user_id, None)
+    try:
+        await get_async_redis_client().delete(*(get_user_cache_key(user_id) for user_id in user_ids))
+    except RedisError:
+        pass
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def user_changed(mapper, connection, user: User) -> None:
+    """Cache is invalidated after commit, so concurrent request can't cache uncommitted state"""
+    object_session(user).info.setdefault(CHANGED_USERS, set()).add(user.id)
+
+
+@event.listens_for(Session, "after_commit")
+def users_committed(session: Session) -> None:
+    user_ids = session.info.pop(CHANGED_USERS, None)
+    if not user_ids:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Sync session outside of app: Redis entries expire after USER_CACHE_TTL
+        for user_id in user_ids:
+            _local_users.pop(user_id, None)
+        return
+    task = loop.create_task(invalidate_cached_users(user_ids))
+    _invalidations.add(task)
+    task.add_done_callback(_invalidations.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def users_rolled_back(session: Session) -> None:
+    session.info.pop(CHANGED_USERS, None)
+
+
+def get_user_cache_statistics() -> dict:
+    return {"local_users": len(_local_users)} | dict(user_cache_statistics)
@@ -0,0 +1,479 @@
+from collections import Counter
+from uuid import UUID, uuid4
+
+from sqlalchemy import Row, select, update, delete, exists, values, column, String, Integer, Uuid
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import (
+    SubmissionStatus,
+    Submission,
+    Attempt,
+    AttemptOutbox,
+    Practice,
+    TestCase,
+    COUNTED_STATUSES,
+    get_status_counter_name,
+)
+from app.schemas.callback_server import CallbackServerRequest
+from .verdict_cache import store_verdict
+from .single_run import parse_single_run_output, get_test_status, skip_after_failure
+from .submission_output import make_output_row, make_result_output_row, save_outputs
+
+
+STATUS_ID_MAP = {
+    1: SubmissionStatus.IN_QUEUE,
+    2: SubmissionStatus.IN_QUEUE,
+    3: SubmissionStatus.ACCEPTED,
+    4: SubmissionStatus.WRONG_ANSWER,
+    5: SubmissionStatus.TIME_LIMIT_EXCEED,
+    6: SubmissionStatus.COMPILATION_ERROR,
+    7: SubmissionStatus.RUNTIME_ERROR,  # Segfault
+    8: SubmissionStatus.RUNTIME_ERROR,  # File size
+    9: SubmissionStatus.RUNTIME_ERROR,  # Float error
+    10: SubmissionStatus.RUNTIME_ERROR,  # Abort error
+    11: SubmissionStatus.RUNTIME_ERROR,  # Non-zero exit code
+    12: SubmissionStatus.RUNTIME_ERROR,  # Other error
+} | {i: SubmissionStatus.SERVICE_ERROR for i in range(13, 20)}
+
+NOT_CACHED_STATUSES = (SubmissionStatus.IN_QUEUE, SubmissionStatus.SERVICE_ERROR)
+
+# Statuses deciding attempt verdict in fail fast mode
+FAILED_STATUSES = (
+    SubmissionStatus.WRONG_ANSWER,
+    SubmissionStatus.TIME_LIMIT_EXCEED,
+    SubmissionStatus.MEMORY_LIMIT_EXCEED,
+    SubmissionStatus.RUNTIME_ERROR,
+    SubmissionStatus.COMPILATION_ERROR,
+)
+
+
+# Current dispatch try of attempt, written by dispatcher before sending tests
+CURRENT_DISPATCH_ID = Attempt.meta["dispatch_id"].as_string()
+
+
+class ResultNotReady(Exception):
+    """Result came before dispatcher saved its submission, it should be applied later"""
+
+
+def get_verdict(counter: Counter) -> SubmissionStatus:
+    """
+    :param counter: number of tests by status
+    """
+    # Skipped tests do not affect verdict
+    counter = counter.copy()
+    del counter[SubmissionStatus.SKIPPED]
+    # If any service error
+    if counter[SubmissionStatus.SERVICE_ERROR] > 0:
+        return SubmissionStatus.SERVICE_ERROR
+    # If all accepted
+    if counter[SubmissionStatus.ACCEPTED] == counter.total():
+        return SubmissionStatus.ACCEPTED
+    # First appropriate status (most common, != Accepted)
+    for status, _ in counter.most_common():
+        if status != SubmissionStatus.ACCEPTED:
+            return status
+
+
+def get_attempt_verdict(statuses: list[str]) -> SubmissionStatus:
+    return get_verdict(Counter(statuses))
+
+
+def get_status_counter(status: str):
+    """Attempt column counting tests in status"""
+    return getattr(Attempt, get_status_counter_name(status))
+
+
+def get_status_counts(attempt: Attempt | Row) -> Counter:
+    """Number of tests by status from attempt counters"""
+    return Counter({status: getattr(attempt, get_status_counter_name(status)) for status in COUNTED_STATUSES})
+
+
+def get_result_status(result: CallbackServerRequest) -> SubmissionStatus:
+    if result.status is None:
+        return SubmissionStatus.IN_QUEUE
+    return STATUS_ID_MAP.get(result.status.id, SubmissionStatus.SERVICE_ERROR)
+
+
+async def skip_remaining_tests(session: AsyncSession, attempt_id: UUID, practice_id: UUID) -> int:
+    """
+    Fail fast: finish attempt without waiting for tests in runner queue, undispatched tests are
+    never sent. Results of skipped tests are ignored
+    :return: number of skipped tests
+    """
+    skipped = await session.execute(
+        update(Submission).
+        where(Submission.attempt_id == attempt_id).
+        where(Submission.status == SubmissionStatus.IN_QUEUE).
+        values(status=SubmissionStatus.SKIPPED)
+    )
+    dispatched = (
+        select(Submission.testcase_id).
+        where(Submission.attempt_id == attempt_id).
+        where(Submission.testcase_id.is_not(None))
+    )
+    not_dispatched = list(await session.scalars(
+        select(TestCase.id).
+        where(TestCase.practice_id == practice_id).
+        where(TestCase.id.not_in(dispatched))
+    ))
+    if not_dispatched:
+        await session.execute(
+            insert(Submission),
+            [
+                {
+                    "token": uuid4(),
+                    "status": SubmissionStatus.SKIPPED,
+                    "time": 0,
+                    "memory": 0,
+                    "attempt_id": attempt_id,
+                    "testcase_id": testcase_id,
+                }
+                for testcase_id in not_dispatched
+            ]
+        )
+    await session.execute(
+        delete(AttemptOutbox).
+        where(AttemptOutbox.attempt_id == attempt_id)
+    )
+    return skipped.rowcount + len(not_dispatched)
+
+
+async def release_next_wave(session: AsyncSession, attempt_id: UUID) -> None:
+    """Fail fast: next wave of tests is dispatched when all tests of previous one passed"""
+    in_queue = await session.scalar(
+        select(exists().where(
+            Submission.attempt_id == attempt_id,
+            Submission.status == SubmissionStatus.IN_QUEUE,
+        ))
+    )
+    if not in_queue:
+        await session.execute(
+            update(AttemptOutbox).
+            where(AttemptOutbox.attempt_id == attempt_id).
+            values(parked=False)
+        )
+
+
+COUNTED_ATTEMPT_COLUMNS = (
+    Attempt.id,
+    Attempt.practice_id,
+    Attempt.meta,
+    Attempt.status,
+    Attempt.tests_completed,
+    Attempt.tests_needed,
+    *(get_status_counter(status) for status in COUNTED_STATUSES),
+    select(Practice.fail_fast).
+    where(Practice.id == Attempt.practice_id).
+    scalar_subquery().
+    label("fail_fast"),
+)
+
+
+async def finish_attempt(session: AsyncSession, attempt: Row, skipped: int = 0) -> Row:
+    """
+    Set verdict from attempt counters, submissions are not scanned
+    :param attempt: COUNTED_ATTEMPT_COLUMNS of locked attempt
+    :param skipped: number of tests skipped after failure
+    :return: id, practice_id, meta and status of attempt
+    """
+    counts = get_status_counts(attempt)
+    counts[SubmissionStatus.SKIPPED] += skipped
+    skipped_counter = get_status_counter(SubmissionStatus.SKIPPED)
+    return (await session.execute(
+        update(Attempt).
+        where(Attempt.id == attempt.id).
+        values(
+            {
+                Attempt.status: get_verdict(counts),
+                Attempt.tests_completed: Attempt.tests_needed,
+                skipped_counter: skipped_counter + skipped,
+            }
+        ).
+        returning(Attempt.id, Attempt.practice_id, Attempt.meta, Attempt.status)
+    )).one()
+
+
+async def apply_submission_result(
+        session: AsyncSession,
+        result: CallbackServerRequest,
+        attempt_id: UUID | None = None,
+        testcase_id: int | None = None,
+        dispatch_id: UUID | None = None,
+) -> Row | None:
+    """
+    Save runner result of one test and finish attempt if it was the last one.
+    Same result may come from callback and reconciler, it is applied once.
+    With attempt, testcase and dispatch try known from callback url, submission is created if dispatcher
+    has not saved it yet. Results of submissions created by earlier tries are ignored.
+    Attempt row is locked only by counter increment, so callbacks of one attempt wait for each
+    other just for the rest of transaction
+    :return: id, practice_id, meta and status of attempt, None if result is ignored
+    :raise ResultNotReady: if submission is unknown
+    """
+    submission_status = get_result_status(result)
+    if submission_status == SubmissionStatus.IN_QUEUE:
+        return None
+    values = {
+        "status": submission_status,
+        "time": int((result.time or 0) * 1000),
+        "memory": result.memory or 0,
+    }
+    # Only the first of repeated results changes queued submission, repeated one matches no rows
+    # and takes no locks
+    saved_attempt_id = await session.scalar(
+        update(Submission).
+        where(Submission.token == result.token).
+        where(Submission.status == SubmissionStatus.IN_QUEUE).
+        values(**values).
+        returning(Submission.attempt_id)
+    )
+    if saved_attempt_id is None:
+        if attempt_id is None or testcase_id is None or dispatch_id is None:
+            if not await session.scalar(select(exists().where(Submission.token == result.token))):
+                raise ResultNotReady
+            return None
+        # Result came before dispatcher saved submission, it's dropped if test is already skipped
+        # or has result of the same token. Attempt is locked, so dispatcher can't start
+        # next try and send this test again until the result is committed
+        if await session.scalar(
+            select(Attempt.id).
+            where(Attempt.id == attempt_id).
+            where(CURRENT_DISPATCH_ID == str(dispatch_id)).
+            with_for_update()
+        ) is None:
+            # Submission of earlier try is orphaned, its test is sent again
+            return None
+        saved_attempt_id = await session.scalar(
+            insert(Submission).
+            values(token=result.token, attempt_id=attempt_id, testcase_id=testcase_id, **values).
+            on_conflict_do_nothing().
+            returning(Submission.attempt_id)
+        )
+        if saved_attempt_id is None:
+            return None
+    await save_outputs(session, [make_result_output_row(result)])
+    # Attempt already finished (fail fast) is not changed
+    status_counter = get_status_counter(submission_status)
+    attempt = (await session.execute(
+        update(Attempt).
+        where(Attempt.id == saved_attempt_id).
+        where(Attempt.status == SubmissionStatus.IN_QUEUE).
+        values({Attempt.tests_completed: Attempt.tests_completed + 1, status_counter: status_counter + 1}).
+        returning(*COUNTED_ATTEMPT_COLUMNS)
+    )).one_or_none()
+    if attempt is None:
+        return None
+    return await complete_attempt(session, attempt, submission_status in FAILED_STATUSES)
+
+
+async def complete_attempt(session: AsyncSession, attempt: Row, failed: bool) -> Row:
+    """
+    Finish attempt after counter increment if all tests are completed (or one failed in fail fast mode)
+    :param attempt: COUNTED_ATTEMPT_COLUMNS of attempt
+    :param failed: attempt got result with FAILED_STATUSES
+    """
+    if attempt.fail_fast:
+        if failed:
+            skipped = await skip_remaining_tests(session, attempt.id, attempt.practice_id)
+            return await finish_attempt(session, attempt, skipped)
+        if attempt.tests_completed < attempt.tests_needed:
+            await release_next_wave(session, attempt.id)
+    # Increments of all other tests are committed before the last one
+    if attempt.tests_completed >= attempt.tests_needed:
+        return await finish_attempt(session, attempt)
+    return attempt
+
+
+async def apply_submission_results(
+        session: AsyncSession,
+        results: list[tuple[CallbackServerRequest, UUID | None, int | None, UUID | None]],
+) -> tuple[list[Row], set[UUID]]:
+    """
+    Bulk version of apply_submission_result for micro-batch of results
+    :param results: result with attempt, testcase and dispatch try from callback url (or None)
+    :return: changed attempts (id, practice_id, meta and status) and tokens of results, that are not ready
+    """
+    rows = {}
+    received = {}
+    dispatch_ids = {}
+    for result, attempt_id, testcase_id, dispatch_id in results:
+        submission_status = get_result_status(result)
+        if submission_status == SubmissionStatus.IN_QUEUE or result.token in rows:
+            continue
+        received[result.token] = result
+        dispatch_ids[result.token] = dispatch_id
+        rows[result.token] = {
+            "token": result.token,
+            "status": submission_status,
+            "time": int((result.time or 0) * 1000),
+            "memory": result.memory or 0,
+            "attempt_id": attempt_id,
+            "testcase_id": testcase_id,
+        }
+    if not rows:
+        return [], set()
+    new_results = values(
+        column("token", Uuid),
+        column("status", String),
+        column("time", Integer),
+        column("memory", Integer),
+        name="new_result",
+    ).data([(row["token"], row["status"], row["time"], row["memory"]) for row in rows.values()])
+    # Only the first of repeated results changes queued submission
+    saved = dict((await session.execute(
+        update(Submission).
+        where(Submission.token == new_results.c.token).
+        where(Submission.status == SubmissionStatus.IN_QUEUE).
+        values(status=new_results.c.status, time=new_results.c.time, memory=new_results.c.memory).
+        returning(Submission.token, Submission.attempt_id)
+    )).all())
+    missing = [row for token, row in rows.items() if token not in saved]
+    is_correlated = {
+        row["token"]: None not in (row["attempt_id"], row["testcase_id"], dispatch_ids[row["token"]])
+        for row in missing
+    }
+    correlated = [row for row in missing if is_correlated[row["token"]]]
+    uncorrelated = [row["token"] for row in missing if not is_correlated[row["token"]]]
+    # Attempts are locked in the same order by all appliers
+    current_tries = dict((await session.execute(
+        select(Attempt.id, CURRENT_DISPATCH_ID).
+        where(Attempt.id.in_(set(saved.values()) | {row["attempt_id"] for row in correlated})).
+        order_by(Attempt.id).
+        with_for_update()
+    )).all())
+    # Results of submissions created by earlier dispatch tries are ignored
+    correlated = [
+        row for row in correlated
+        if current_tries.get(row["attempt_id"]) == str(dispatch_ids[row["token"]])
+    ]
+    if correlated:
+        # Results came before dispatcher saved submissions, results of skipped tests are dropped
+        saved |= dict((await session.execute(
+            insert(Submission).
+            values(correlated).
+            on_conflict_do_nothing().
+            returning(Submission.token, Submission.attempt_id)
+        )).all())
+    not_ready = set()
+    if uncorrelated:
+        known = set(await session.scalars(
+            select(Submission.token).
+            where(Submission.token.in_(uncorrelated))
+        ))
+        not_ready = set(uncorrelated) - known
+    if not saved:
+        return [], not_ready
+    await save_outputs(session, [make_result_output_row(received[token]) for token in saved])
+
+    # Number of new results by attempt and status
+    completed = {}
+    failed = set()
+    for token, attempt_id in saved.items():
+        submission_status = rows[token]["status"]
+        completed.setdefault(attempt_id, Counter())[submission_status] += 1
+        if submission_status in FAILED_STATUSES:
+            failed.add(attempt_id)
+    counter_names = [get_status_counter_name(status) for status in COUNTED_STATUSES]
+    increments = values(
+        column("id", Uuid),
+        column("count", Integer),
+        *(column(name, Integer) for name in counter_names),
+        name="increment",
+    ).data([
+        (attempt_id, counts.total(), *(counts[status] for status in COUNTED_STATUSES))
+        for attempt_id, counts in completed.items()
+    ])
+    attempts = (await session.execute(
+        update(Attempt).
+        where(Attempt.id == increments.c.id).
+        where(Attempt.status == SubmissionStatus.IN_QUEUE).
+        values(
+            {Attempt.tests_completed: Attempt.tests_completed + increments.c.count} |
+            {getattr(Attempt, name): getattr(Attempt, name) + increments.c[name] for name in counter_names}
+        ).
+        returning(*COUNTED_ATTEMPT_COLUMNS)
+    )).all()
+    return [await complete_attempt(session, attempt, attempt.id in failed) for attempt in attempts], not_ready
+
+
+async def apply_single_run_result(
+        session: AsyncSession,
+        attempt_id: UUID,
+        result: CallbackServerRequest,
+) -> Attempt | None:
+    """
+    Split harness output of single run attempt into per-test submissions and finish attempt
+    :return: updated attempt, None if result is ignored
+    :raise ResultNotReady: if dispatcher has not saved run token yet
+    """
+    run_status = get_result_status(result)
+    if run_status == SubmissionStatus.IN_QUEUE:
+        return None
+    # Repeated result is detected without lock
+    current_status = await session.scalar(
+        select(Attempt.status).where(Attempt.id == attempt_id)
+    )
+    if current_status != SubmissionStatus.IN_QUEUE:
+        return None
+    attempt: Attempt = await session.scalar(
+        select(Attempt).
+        where(Attempt.id == attempt_id).
+        with_for_update()
+    )
+    if attempt is None or attempt.status != SubmissionStatus.IN_QUEUE:
+        return None
+    if "run_token" not in attempt.meta:
+        raise ResultNotReady
+    # Outdated result of repeated dispatch
+    if attempt.meta["run_token"] != str(result.token):
+        return None
+    results = {}
+    if run_status != SubmissionStatus.COMPILATION_ERROR and "run_marker" in attempt.meta:
+        results = parse_single_run_output(result.stdout, attempt.meta["run_marker"])
+    testcases = {
+        testcase.id: testcase
+        for testcase in await session.scalars(
+            select(TestCase).
+            where(TestCase.practice_id == attempt.practice_id)
+        )
+    }
+    fail_fast = await session.scalar(
+        select(Practice.fail_fast).
+        where(Practice.id == attempt.practice_id)
+    )
+    submissions = sorted(attempt.submissions, key=lambda submission: submission.testcase_id or 0)
+    outputs = []
+    for submission in submissions:
+        test_result = results.get(submission.testcase_id)
+        testcase = testcases.get(submission.testcase_id)
+        if test_result is None or testcase is None:
+            # Test was not reached: whole run failed (or harness is broken if run succeeded)
+            submission.status = (
+                SubmissionStatus.SERVICE_ERROR if run_status == SubmissionStatus.ACCEPTED else run_status
+            )
+            output = {"stderr": result.stderr}
+        else:
+            submission.status = get_test_status(test_result, testcase.excepted)
+            submission.time = test_result.time
+            output = {"stdout": test_result.output}
+        submission.memory = result.memory or 0
+        output |= {"compile_output": result.compile_output, "message": result.message}
+        outputs.append(make_output_row(submission.token, output))
+    if fail_fast:
+        statuses = skip_after_failure([submission.status for submission in submissions])
+        for submission, submission_status in zip(submissions, statuses):
+            submission.status = submission_status
+    counts = Counter(submission.status for submission in attempt.submissions)
+    for status in COUNTED_STATUSES:
+        setattr(attempt, get_status_counter_name(status), counts[status])
+    attempt.tests_completed = len(attempt.submissions)
+    attempt.status = get_verdict(counts)
+    await save_outputs(session, outputs)
+    return attempt
+
+
+async def share_verdict(attempt: Attempt | Row) -> None:
+    """Share verdict of committed attempt with identical attempts"""
+    if attempt.status not in NOT_CACHED_STATUSES and "verdict_key" in attempt.meta:
+        await store_verdict(attempt.practice_id, attempt.meta["verdict_key"], attempt.id)
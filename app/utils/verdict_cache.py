@@ -0,0 +1,85 @@
+from hashlib import sha256
+from uuid import UUID
+
+from redis.exceptions import RedisError
+
+from app.config import settings, get_async_redis_client
+from app.db.models import Practice, TestCase
+
+
+def get_cache_key(practice_id: UUID) -> str:
+    return f"verdict_cache:{practice_id}"
+
+
+def get_testcases_digest(testcases: list[TestCase]) -> str:
+    digest = sha256()
+    for testcase in sorted(testcases, key=lambda testcase: testcase.id):
+        for part in (str(testcase.id), testcase.input, testcase.excepted):
+            digest.update(part.encode())
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get_verdict_key(
+        practice: Practice,
+        testcases: list[TestCase],
+        source_code: str,
+        language_id: int,
+) -> str:
+    """
+    Content address of attempt verdict: same key means same program, limits, tests and way of running them
+    """
+    digest = sha256()
+    for part in (
+        source_code,
+        language_id,
+        practice.memory_limit,
+        practice.time_limit,
+        practice.max_threads,
+        practice.network,
+        practice.command_line_args,
+        # Single run measures time differently, fail fast skips tests after failure
+        practice.execution_mode,
+        practice.fail_fast,
+        get_testcases_digest(testcases),
+    ):
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def get_cached_attempt_id(practice_id: UUID, verdict_key: str) -> UUID | None:
+    """
+    :return: id of finished attempt with the same verdict key
+    """
+    if not settings.VERDICT_CACHE_ENABLED:
+        return None
+    try:
+        attempt_id = await get_async_redis_client().hget(get_cache_key(practice_id), verdict_key)
+    except RedisError:
+        return None
+    return UUID(attempt_id.decode()) if attempt_id else None
+
+
+async def store_verdict(practice_id: UUID, verdict_key: str, attempt_id: UUID) -> None:
+    if not settings.VERDICT_CACHE_ENABLED:
+        return
+    key = get_cache_key(practice_id)
+    try:
+        async with get_async_redis_client().pipeline() as pipeline:
+            pipeline.hset(key, verdict_key, str(attempt_id))
+            pipeline.expire(key, settings.VERDICT_CACHE_TTL)
+            await pipeline.execute()
+    except RedisError:
+        pass
+
+
+async def invalidate_verdicts(practice_id: UUID) -> None:
+    """
+    Must be called when practice limits or testcases are changed.
+    Limits and testcases are part of the verdict key, so a failed invalidation leaves only unreachable entries
+    """
+    try:
+        await get_async_redis_client().delete(get_cache_key(practice_id))
+    except RedisError:
+        pass
@@ -0,0 +1,359 @@
+import asyncio
+import logging
+from datetime import timedelta
+from uuid import UUID, uuid4
+
+from sqlalchemy import select, update, delete, func, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.db import SessionManager
+from app.db.models import (
+    Attempt,
+    AttemptOutbox,
+    Practice,
+    Submission,
+    SubmissionStatus,
+    ExecutionMode,
+    TestCase,
+)
+from app.utils.judge0 import create_submissions, make_submission_payloads, get_callback_url, RunnerQueueFull
+from app.utils.single_run import make_single_run_payload, fits_single_run
+from app.utils.requests import get_judge0_client, get_judge0_breaker
+from app.utils.backpressure import (
+    acquire_dispatch_slot,
+    release_dispatch_slot,
+    get_runner_headroom,
+    reserve_runner_node,
+    release_runner_node,
+    mark_runner_queue_full,
+)
+from app.utils.verdict import CURRENT_DISPATCH_ID
+from .scheduler import schedule_outbox, lease_is_free
+
+
+logger = logging.getLogger(__name__)
+
+_wakeup = asyncio.Event()
+
+
+def wake_dispatcher() -> None:
+    """Start next dispatch round without waiting for poll interval"""
+    _wakeup.set()
+
+
+def count_outbox_tests():
+    """Upper bound of submissions dispatched for outbox row: all tests of practice"""
+    return (
+        select(func.count(TestCase.id)).
+        join(Attempt, Attempt.practice_id == TestCase.practice_id).
+        where(Attempt.id == AttemptOutbox.attempt_id).
+        scalar_subquery()
+    )
+
+
+async def claim_outbox(session_maker: sessionmaker, headroom: int) -> list:
+    """
+    Lease a portion of pending outbox rows to this process.
+    Rows are taken in dispatch order while their tests fit into runner headroom, the first one is always taken,
+    so attempt with many tests is not starved.
+    Row locks are released on commit, so the runner is called without holding a DB connection
+    """
+    async with session_maker() as session:
+        scheduled = list(await session.scalars(schedule_outbox(settings.DISPATCHER_BATCH_SIZE)))
+        # Row locks on scheduled rows, rows taken by concurrent dispatcher are skipped
+        tests = dict((await session.execute(
+            select(AttemptOutbox.id, count_outbox_tests()).
+            where(AttemptOutbox.id.in_(scheduled)).
+            where(lease_is_free()).
+            with_for_update(of=AttemptOutbox, skip_locked=True)
+        )).all())
+        claimed = []
+        for outbox_id in scheduled:
+            if outbox_id not in tests:
+                continue
+            if claimed and tests[outbox_id] > headroom:
+                break
+            claimed.append(outbox_id)
+            headroom -= tests[outbox_id]
+        rows = (await session.execute(
+            update(AttemptOutbox).
+            where(AttemptOutbox.id.in_(claimed)).
+            values(
+                locked_until=func.now() + timedelta(seconds=settings.DISPATCHER_LEASE_SECONDS),
+                tries=AttemptOutbox.tries + 1,
+            ).
+            returning(
+                AttemptOutbox.id,
+                AttemptOutbox.attempt_id,
+                AttemptOutbox.source_code,
+                AttemptOutbox.tries,
+            ).
+            execution_options(synchronize_session=False)
+        )).all()
+        await session.commit()
+    return list(rows)
+
+
+async def start_dispatch_try(session: AsyncSession, attempt: Attempt) -> UUID | None:
+    """
+    Begin new dispatch generation of attempt.
+    From now on callbacks of runner submissions created by previous tries are rejected, so submissions
+    orphaned by partly failed try are not counted along with their redispatched copies
+    :return: dispatch id, None if attempt is already finished
+    """
+    dispatch_id = uuid4()
+    # Row lock orders this with callbacks checking generation
+    started = await session.scalar(
+        update(Attempt).
+        where(Attempt.id == attempt.id).
+        where(Attempt.status == SubmissionStatus.IN_QUEUE).
+        values(meta=attempt.meta | {"dispatch_id": str(dispatch_id)}).
+        returning(Attempt.id)
+    )
+    return dispatch_id if started else None
+
+
+async def get_remaining_tests(session: AsyncSession, attempt_id: UUID, testcases: list[TestCase]) -> list[TestCase]:
+    """
+    Tests without submission. Results of tests sent by failed try may be saved already, these are not sent again
+    """
+    dispatched = set(await session.scalars(
+        select(Submission.testcase_id).
+        where(Submission.attempt_id == attempt_id)
+    ))
+    return [testcase for testcase in testcases if testcase.id not in dispatched]
+
+
+def get_next_wave(remaining: list[TestCase], dispatched: int) -> list[TestCase]:
+    """
+    Fail fast attempt is dispatched by waves, so tests after first failure never reach runner.
+    Every wave is as large as all previous ones together
+    """
+    wave_size = max(settings.FAIL_FAST_WAVE_SIZE, dispatched)
+    return remaining[:wave_size]
+
+
+async def release_outbox_row(session: AsyncSession, outbox_id: int) -> None:
+    """Return claimed row to outbox without spending a try"""
+    await session.execute(
+        update(AttemptOutbox).
+        where(AttemptOutbox.id == outbox_id).
+        values(locked_until=None, tries=AttemptOutbox.tries - 1)
+    )
+    await session.commit()
+
+
+async def dispatch_attempt(
+        session_maker: sessionmaker,
+        outbox_id: int,
+        attempt_id: UUID,
+        source_code: str,
+        tries: int,
+) -> None:
+    async with session_maker() as session:
+        attempt = await session.get(Attempt, attempt_id)
+        practice = await session.get(Practice, attempt.practice_id)
+        testcases = sorted(practice.testcases, key=lambda testcase: testcase.id)
+        dispatch_id = await start_dispatch_try(session, attempt)
+        if dispatch_id is None:
+            # Attempt was finished while waiting in outbox
+            await session.execute(
+                delete(AttemptOutbox).
+                where(AttemptOutbox.id == outbox_id)
+            )
+            await session.commit()
+            return
+        meta = attempt.meta | {"dispatch_id": str(dispatch_id)}
+        # Too long attempts are tested per test even in single run mode
+        single_run = (
+            practice.execution_mode == ExecutionMode.SINGLE_RUN and
+            fits_single_run(practice, testcases)
+        )
+        remaining = wave = testcases
+        if not single_run:
+            remaining = wave = await get_remaining_tests(session, attempt_id, testcases)
+            if practice.fail_fast:
+                wave = get_next_wave(remaining, len(testcases) - len(remaining))
+        await session.commit()
+        # Tags harness result lines, it's known only to harness and callback
+        run_marker = uuid4().hex
+        if single_run:
+            payloads = [
+                make_single_run_payload(
+                    practice=practice,
+                    testcases=testcases,
+                    source_code=source_code,
+                    language_id=attempt.language_id,
+                    callback_url=get_callback_url(f"/run/{attempt_id}"),
+                    marker=run_marker,
+                )
+            ]
+        else:
+            payloads = make_submission_payloads(
+                practice=practice,
+                testcases=wave,
+                source_code=source_code,
+                language_id=attempt.language_id,
+                attempt_id=attempt_id,
+                dispatch_id=dispatch_id,
+            )
+
+    lease_id = await acquire_dispatch_slot()
+    tokens = None
+    queue_full = False
+    try:
+        reservation = await reserve_runner_node(len(payloads))
+        if reservation is not None:
+            node, reserved = reservation
+            if reserved < len(payloads):
+                # Node has room only for part of the wave, the rest is sent in next rounds
+                payloads = payloads[:reserved]
+                wave = wave[:reserved]
+            try:
+                tokens = await create_submissions(client=get_judge0_client(), payloads=payloads, node=node)
+            except RunnerQueueFull:
+                queue_full = True
+            finally:
+                if tokens is None:
+                    await release_runner_node(node, reserved)
+            if queue_full:
+                # After release, so the reservation does not make node look free again
+                await mark_runner_queue_full(node)
+    finally:
+        await release_dispatch_slot(lease_id)
+    if reservation is None or queue_full:
+        # All runner nodes are down or busy: attempt waits in outbox without spending tries
+        async with session_maker() as session:
+            await release_outbox_row(session, outbox_id)
+        return
+
+    async with session_maker() as session:
+        if tokens is None:
+            breaker = get_judge0_breaker(node)
+            if breaker.state != breaker.CLOSED:
+                # Runner node is down: attempt waits in outbox without spending tries
+                await release_outbox_row(session, outbox_id)
+                return
+            if tries < settings.DISPATCHER_MAX_TRIES:
+                # Row will be claimed again after lease expiration
+                logger.warning("Dispatch of attempt %s failed (try %s)", attempt_id, tries)
+                return
+            # if service not available: mark attempt as service error
+            await session.execute(
+                update(Attempt).
+                where(Attempt.id == attempt_id).
+                values(status=SubmissionStatus.SERVICE_ERROR)
+            )
+        else:
+            if single_run:
+                # Result of the only runner job is split into these submissions by callback.
+                # Marker must stay secret from the program, meta is not returned by API (PUBLIC_META_KEYS)
+                meta = meta | {"run_token": tokens[0], "run_marker": run_marker}
+                tokens = [uuid4() for _ in wave]
+            # Row lock orders this with callbacks, results of this wave may be already saved by them
+            in_progress = await session.scalar(
+                update(Attempt).
+                where(Attempt.id == attempt_id).
+                where(Attempt.status == SubmissionStatus.IN_QUEUE).
+                where(CURRENT_DISPATCH_ID == str(dispatch_id)).
+                values(tests_needed=len(testcases), meta=meta).
+                returning(Attempt.id)
+            )
+            if not in_progress and await session.scalar(
+                select(Attempt.status).where(Attempt.id == attempt_id)
+            ) == SubmissionStatus.IN_QUEUE:
+                # Lease expired and newer try owns outbox row, submissions of this one are orphaned
+                logger.warning("Dispatch of attempt %s was superseded (try %s)", attempt_id, tries)
+                return
+            if in_progress and tokens:
+                statement = insert(Submission)
+                await session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[Submission.token],
+                        set_={"node": statement.excluded.node},
+                    ),
+                    [
+                        {
+                            "token": token,
+                            "status": SubmissionStatus.IN_QUEUE,
+                            "time": 0,
+                            "memory": 0,
+                            "attempt_id": attempt_id,
+                            "testcase_id": testcase.id,
+                            "node": node,
+                        }
+                        for token, testcase in zip(tokens, wave)
+                    ]
+                )
+            if in_progress and len(wave) < len(remaining):
+                # Next fail fast wave is released by callback when all tests of this one are accepted,
+                # tests cut by runner capacity are sent in next rounds
+                in_queue = await session.scalar(
+                    select(exists().where(
+                        Submission.attempt_id == attempt_id,
+                        Submission.status == SubmissionStatus.IN_QUEUE,
+                    ))
+                )
+                await session.execute(
+                    update(AttemptOutbox).
+                    where(AttemptOutbox.id == outbox_id).
+                    values(parked=practice.fail_fast and in_queue, locked_until=None, tries=0)
+                )
+                await session.commit()
+                return
+        await session.execute(
+            delete(AttemptOutbox).
+            where(AttemptOutbox.id == outbox_id)
+        )
+        await session.commit()
+
+
+async def dispatch_pending(session_maker: sessionmaker) -> int:
+    """
+    Dispatch one portion of outbox
+    :return: number of claimed attempts
+    """
+    # Keep new work in outbox while all runner nodes are down or their queues are full
+    headroom = await get_runner_headroom()
+    if headroom <= 0:
+        return 0
+    rows = await claim_outbox(session_maker, headroom)
+    results = await asyncio.gather(
+        *(
+            dispatch_attempt(
+                session_maker=session_maker,
+                outbox_id=row.id,
+                attempt_id=row.attempt_id,
+                source_code=row.source_code,
+                tries=row.tries,
+            )
+            for row in rows
+        ),
+        return_exceptions=True,
+    )
+    for row, result in zip(rows, results):
+        if isinstance(result, Exception):
+            logger.error("Dispatch of attempt %s failed", row.attempt_id, exc_info=result)
+    return len(rows)
+
+
+async def run_dispatcher() -> None:
+    """
+    Drain attempt outbox to Judge0 until cancelled
+    """
+    session_maker = SessionManager().get_session_maker()
+    while True:
+        _wakeup.clear()
+        try:
+            claimed = await dispatch_pending(session_maker)
+        except Exception:
+            logger.exception("Dispatcher round failed")
+            claimed = 0
+        if claimed < settings.DISPATCHER_BATCH_SIZE:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.DISPATCHER_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
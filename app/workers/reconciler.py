@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+from uuid import UUID
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.db import SessionManager
+from app.db.models import Attempt, Submission, SubmissionStatus
+from app.schemas.callback_server import CallbackServerRequest
+from app.utils.requests import get_judge0_client
+from app.utils.judge0 import get_submissions, get_judge0_nodes
+from app.utils.verdict import apply_submission_result, apply_single_run_result, share_verdict
+
+
+logger = logging.getLogger(__name__)
+
+reconciler_statistics = Counter()
+
+# Result of submission unknown to runner (e.g. runner database was lost)
+LOST_SUBMISSION_STATUS = {"id": 13, "description": "Internal Error"}
+
+
+async def find_stale_submissions(session_maker: sessionmaker) -> list:
+    """Submissions waiting for callback longer than threshold"""
+    async with session_maker() as session:
+        rows = (await session.execute(
+            select(Submission.token, Submission.node, Submission.attempt_id, Attempt.meta).
+            join(Attempt, Attempt.id == Submission.attempt_id).
+            where(Submission.status == SubmissionStatus.IN_QUEUE).
+            where(Submission.created_at < func.now() - timedelta(seconds=settings.RECONCILER_STALE_AFTER)).
+            where(Attempt.status == SubmissionStatus.IN_QUEUE).
+            order_by(Submission.created_at).
+            limit(settings.RECONCILER_BATCH_SIZE)
+        )).all()
+    return list(rows)
+
+
+def group_runner_tokens(rows: list) -> dict[str, dict[str, UUID | None]]:
+    """
+    Runner tokens to fetch by node.
+    Single run attempt has one runner token for all its submissions
+    :return: node -> {runner token: single run attempt id or None}
+    """
+    tokens = defaultdict(dict)
+    for row in rows:
+        node = row.node or get_judge0_nodes()[0]
+        if "run_token" in row.meta:
+            tokens[node][row.meta["run_token"]] = row.attempt_id
+        else:
+            tokens[node][str(row.token)] = None
+    return tokens
+
+
+async def apply_result(session_maker: sessionmaker, result: dict, single_run_attempt_id: UUID | None) -> bool:
+    """
+    Apply fetched result with the same logic as callback server
+    :return: True if result was not applied before
+    """
+    message = CallbackServerRequest.model_validate(result)
+    async with session_maker() as session:
+        if single_run_attempt_id is None:
+            attempt = await apply_submission_result(session, message)
+        else:
+            attempt = await apply_single_run_result(session, single_run_attempt_id, message)
+        await session.commit()
+    if attempt is None:
+        return False
+    await share_verdict(attempt)
+    return True
+
+
+async def reconcile_stale(session_maker: sessionmaker) -> int:
+    """
+    Fetch results of stale submissions from runner nodes
+    :return: number of applied results
+    """
+    rows = await find_stale_submissions(session_maker)
+    applied = 0
+    for node, tokens in group_runner_tokens(rows).items():
+        results = await get_submissions(get_judge0_client(), list(tokens), node)
+        if results is None:
+            logger.warning("Runner node %s is unavailable for reconciliation", node)
+            continue
+        for (token, single_run_attempt_id), result in zip(tokens.items(), results):
+            if result is None:
+                reconciler_statistics["lost_submissions"] += 1
+                result = dict.fromkeys(CallbackServerRequest.model_fields) | {
+                    "token": token,
+                    "status": LOST_SUBMISSION_STATUS,
+                }
+            try:
+                applied += await apply_result(session_maker, result, single_run_attempt_id)
+            except Exception:
+                logger.exception("Reconciliation of submission %s failed", token)
+    reconciler_statistics["applied_results"] += applied
+    return applied
+
+
+async def run_reconciler() -> None:
+    """
+    Apply results of submissions with lost callbacks until cancelled
+    """
+    session_maker = SessionManager().get_session_maker()
+    while True:
+        try:
+            applied = await reconcile_stale(session_maker)
+            if applied:
+                logger.warning("Applied %s results of lost callbacks", applied)
+        except Exception:
+            logger.exception("Reconciliation round failed")
+        await asyncio.sleep(settings.RECONCILER_INTERVAL)
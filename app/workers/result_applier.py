@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.db import SessionManager
+from app.utils.result_queue import (
+    QueuedResult,
+    create_result_group,
+    read_results,
+    claim_stale_results,
+    acknowledge_results,
+)
+from app.utils.verdict import apply_submission_results, share_verdict
+
+
+logger = logging.getLogger(__name__)
+
+
+async def apply_batch(session_maker: sessionmaker, batch: list[QueuedResult]) -> None:
+    """
+    Apply micro-batch of queued results in one transaction and acknowledge them.
+    Results with unknown token stay in queue and are retried, until reconciler takes care of them
+    """
+    valid = [entry for entry in batch if entry.result is not None]
+    if len(valid) < len(batch):
+        logger.error("Dropped %s broken results", len(batch) - len(valid))
+    async with session_maker() as session:
+        attempts, not_ready = await apply_submission_results(
+            session,
+            [(entry.result, entry.attempt_id, entry.testcase_id, entry.dispatch_id) for entry in valid],
+        )
+        await session.commit()
+    for attempt in attempts:
+        await share_verdict(attempt)
+    give_up_time = time.time() - settings.RECONCILER_STALE_AFTER
+    retried = {
+        entry.id for entry in valid
+        if entry.result.token in not_ready and entry.queued_at > give_up_time
+    }
+    await acknowledge_results([entry.id for entry in batch if entry.id not in retried])
+
+
+async def run_result_applier(consumer: str) -> None:
+    """
+    Drain callback result queue until cancelled
+    """
+    session_maker = SessionManager().get_session_maker()
+    await create_result_group()
+    last_claim = 0.0
+    while True:
+        try:
+            batch = []
+            if time.monotonic() - last_claim > settings.CALLBACK_QUEUE_RETRY_AFTER:
+                last_claim = time.monotonic()
+                batch = await claim_stale_results(consumer)
+            if not batch:
+                batch = await read_results(consumer)
+            if batch:
+                await apply_batch(session_maker, batch)
+        except Exception:
+            logger.exception("Result batch failed")
+            # Taken results are claimed again after retry interval
+            await asyncio.sleep(settings.CALLBACK_BATCH_WAIT)
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from sqlalchemy import Select, select, or_, case, func, cast, Float
+
+from app.config import settings
+from app.db.models import AttemptOutbox, Course
+
+
+class Priority:
+    URGENT = 0
+    NORMAL = 1
+    DEMOTED = 2
+
+
+def lease_is_free():
+    return or_(
+        AttemptOutbox.locked_until.is_(None),
+        AttemptOutbox.locked_until < func.now(),
+    )
+
+
+def priority_class():
+    return case(
+        (AttemptOutbox.demoted, Priority.DEMOTED),
+        (
+            AttemptOutbox.deadline <= func.now() + timedelta(seconds=settings.DISPATCH_URGENT_WINDOW),
+            Priority.URGENT,
+        ),
+        else_=Priority.NORMAL,
+    )
+
+
+def schedule_outbox(limit: int) -> Select:
+    """
+    Ids of next pending outbox rows in dispatch order.
+
+    Attempts go by priority class: practices with deadline within urgent window first,
+    then the rest, then late attempts and re-runs.
+    Inside a class pending attempts are served round-robin across users: n-th pending attempt
+    of every user goes before (n + 1)-th attempt of anyone. Courses share runner by weighted
+    fair queuing: k-th attempt of a course gets virtual time k / course.dispatch_weight.
+    Closest deadline breaks ties.
+    Parked fail fast attempts wait for callbacks of their previous wave and are not scheduled.
+    """
+    priority = priority_class().label("priority")
+    user_rank = func.row_number().over(
+        partition_by=(priority, AttemptOutbox.author_id),
+        order_by=AttemptOutbox.id,
+    )
+    ranked = (
+        select(
+            AttemptOutbox.id,
+            AttemptOutbox.course_id,
+            AttemptOutbox.deadline,
+            priority,
+            user_rank.label("user_rank"),
+        ).
+        where(lease_is_free()).
+        where(AttemptOutbox.parked == False).
+        subquery()
+    )
+    course_rank = func.row_number().over(
+        partition_by=(ranked.c.priority, ranked.c.course_id),
+        order_by=(ranked.c.user_rank, ranked.c.id),
+    )
+    scheduled = (
+        select(
+            ranked.c.id,
+            ranked.c.course_id,
+            ranked.c.deadline,
+            ranked.c.priority,
+            course_rank.label("course_rank"),
+        ).
+        subquery()
+    )
+    virtual_time = cast(scheduled.c.course_rank, Float) / cast(Course.dispatch_weight, Float)
+    return (
+        select(scheduled.c.id).
+        join(Course, Course.id == scheduled.c.course_id).
+        order_by(scheduled.c.priority, virtual_time, scheduled.c.deadline, scheduled.c.id).
+        limit(limit)
+    )
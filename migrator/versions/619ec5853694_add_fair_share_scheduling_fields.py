@@ -0,0 +1,40 @@
+"""Add fair share scheduling fields
+
+Revision ID: 619ec5853694
+Revises: ad355e59b79b
+Create Date: 2026-10-18 08:30:53.699248
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '619ec5853694'
+down_revision: Union[str, None] = 'ad355e59b79b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('course', sa.Column('dispatch_weight', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('attempt_outbox', sa.Column('author_id', sa.Uuid(), nullable=True))
+    op.add_column('attempt_outbox', sa.Column('course_id', sa.Uuid(), nullable=True))
+    # Fill pending rows
+    op.execute("""
+        UPDATE attempt_outbox SET author_id = attempt.author_id, course_id = practice.course_id
+        FROM attempt JOIN practice ON attempt.practice_id = practice.id
+        WHERE attempt_outbox.attempt_id = attempt.id
+    """)
+    op.alter_column('attempt_outbox', 'author_id', nullable=False)
+    op.alter_column('attempt_outbox', 'course_id', nullable=False)
+    op.create_foreign_key(None, 'attempt_outbox', 'user', ['author_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key(None, 'attempt_outbox', 'course', ['course_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    op.drop_column('attempt_outbox', 'course_id')
+    op.drop_column('attempt_outbox', 'author_id')
+    op.drop_column('course', 'dispatch_weight')
@@ -0,0 +1,35 @@
+"""Add deadline priority fields to attempt outbox
+
+Revision ID: 93f1c46643bd
+Revises: 619ec5853694
+Create Date: 2026-10-18 08:31:30.094620
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '93f1c46643bd'
+down_revision: Union[str, None] = '619ec5853694'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('attempt_outbox', sa.Column('deadline', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column('attempt_outbox', sa.Column('demoted', sa.Boolean(), server_default='false', nullable=False))
+    # Fill pending rows
+    op.execute("""
+        UPDATE attempt_outbox SET deadline = practice.deadline
+        FROM attempt JOIN practice ON attempt.practice_id = practice.id
+        WHERE attempt_outbox.attempt_id = attempt.id
+    """)
+    op.alter_column('attempt_outbox', 'deadline', nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('attempt_outbox', 'demoted')
+    op.drop_column('attempt_outbox', 'deadline')
@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.db import Attempt, AttemptOutbox, Participation, Submission, SubmissionOutput, SubmissionStatus, TestCase
+from app.endpoints import attempt as attempt_endpoint
+from app.utils.submission_output import compress_output
+from tests.utils import (
+    create_test_user,
+    create_test_course,
+    create_test_practice,
+    add_testcase_to_practice,
+    get_user_authorization_header,
+)
+
+
+async def create_attempt_context(session):
+    user, password = await create_test_user(session)
+    teacher_user, _ = await create_test_user(session, is_teacher=True)
+    course = await create_test_course(session)
+    session.add(Participation(user_id=user.id, course_id=course.id))
+    await session.commit()
+    practice = await create_test_practice(session, course, teacher_user)
+    await add_testcase_to_practice(session, practice, True)
+    return user, password, practice
+
+
+async def test_send_attempt_writes_outbox(client, session):
+    user, password, practice = await create_attempt_context(session)
+    practice.deadline = datetime.now(timezone.utc) + timedelta(days=1)
+    await session.commit()
+
+    response = await client.post(
+        url=f"{settings.PATH_PREFIX}/practice/{practice.id}/attempt",
+        json={"source_code": "print(4)", "language_id": 1},
+        headers=get_user_authorization_header(user, password),
+    )
+    assert response.status_code == 201
+    attempt = await session.scalar(select(Attempt).where(Attempt.author_id == user.id))
+    assert attempt.status == SubmissionStatus.IN_QUEUE
+    outbox = await session.scalar(select(AttemptOutbox).where(AttemptOutbox.attempt_id == attempt.id))
+    assert outbox.source_code == "print(4)"
+    assert outbox.author_id == user.id
+    assert outbox.course_id == practice.course_id
+    assert not outbox.demoted
+
+
+async def test_send_late_attempt_is_demoted(client, session):
+    user, password, practice = await create_attempt_context(session)
+    practice.deadline = datetime.now(timezone.utc) - timedelta(days=1)
+    await session.commit()
+
+    response = await client.post(
+        url=f"{settings.PATH_PREFIX}/practice/{practice.id}/attempt",
+        json={"source_code": "print(4)", "language_id": 1},
+        headers=get_user_authorization_header(user, password),
+    )
+    assert response.status_code == 201
+    outbox = await session.scalar(select(AttemptOutbox).where(AttemptOutbox.author_id == user.id))
+    assert outbox.demoted
+
+
+async def test_send_attempt_not_participant(client, session):
+    user, password, practice = await create_attempt_context(session)
+    stranger, stranger_password = await create_test_user(session)
+
+    response = await client.post(
+        url=f"{settings.PATH_PREFIX}/practice/{practice.id}/attempt",
+        json={"source_code": "print(4)", "language_id": 1},
+        headers=get_user_authorization_header(stranger, stranger_password),
+    )
+    assert response.status_code == 403
+
+
+async def create_tested_attempt(session, user, practice) -> Attempt:
+    testcase = await session.scalar(select(TestCase).where(TestCase.practice_id == practice.id))
+    attempt = Attempt(
+        language_id=1,
+        meta={},
+        sent_time=datetime.now(timezone.utc),
+        author_id=user.id,
+        practice_id=practice.id,
+        status=SubmissionStatus.WRONG_ANSWER,
+        tests_needed=1,
+        tests_completed=1,
+        wrong_answer_count=1,
+    )
+    session.add(attempt)
+    await session.flush()
+    submission = Submission(
+        token=uuid4(),
+        status=SubmissionStatus.WRONG_ANSWER,
+        time=0.1,
+        memory=1024,
+        attempt_id=attempt.id,
+        testcase_id=testcase.id,
+    )
+    session.add(submission)
+    await session.flush()
+    session.add(SubmissionOutput(
+        token=submission.token,
+        stdout=compress_output("5"),
+        message=compress_output("Wrong Answer"),
+    ))
+    await session.commit()
+    return attempt
+
+
+async def test_identical_attempt_reuses_verdict(client, session, monkeypatch):
+    user, password, practice = await create_attempt_context(session)
+    cached_attempt = await create_tested_attempt(session, user, practice)
+    cached_submission = await session.scalar(select(Submission).where(Submission.attempt_id == cached_attempt.id))
+
+    async def get_cached_attempt_id(practice_id, verdict_key):
+        return cached_attempt.id
+
+    monkeypatch.setattr(attempt_endpoint, "get_cached_attempt_id", get_cached_attempt_id)
+    response = await client.post(
+        url=f"{settings.PATH_PREFIX}/practice/{practice.id}/attempt",
+        json={"source_code": "print(4)", "language_id": 1},
+        headers=get_user_authorization_header(user, password),
+    )
+    assert response.status_code == 201
+    attempt = await session.scalar(
+        select(Attempt).where(Attempt.author_id == user.id).where(Attempt.id != cached_attempt.id)
+    )
+    assert attempt.status == SubmissionStatus.WRONG_ANSWER
+    assert attempt.tests_needed == attempt.tests_completed == 1
+    assert attempt.status_counts == {SubmissionStatus.WRONG_ANSWER: 1}
+    assert attempt.meta["reused_from"] == str(cached_attempt.id)
+    [submission] = attempt.submissions
+    assert submission.token != cached_submission.token
+    assert submission.testcase_id == cached_submission.testcase_id
+    assert submission.status == SubmissionStatus.WRONG_ANSWER
+    output = await session.get(SubmissionOutput, submission.token)
+    assert output.stdout == compress_output("5")
+    # Reused attempt is not dispatched
+    assert await session.scalar(select(AttemptOutbox).where(AttemptOutbox.attempt_id == attempt.id)) is None
+
+
+async def test_full_backlog_rejects_before_verdict_cache(client, session, monkeypatch):
+    user, password, practice = await create_attempt_context(session)
+    cache_lookups = []
+
+    async def get_cached_attempt_id(practice_id, verdict_key):
+        cache_lookups.append(verdict_key)
+
+    monkeypatch.setattr(attempt_endpoint, "get_cached_attempt_id", get_cached_attempt_id)
+    monkeypatch.setattr(settings, "DISPATCH_MAX_BACKLOG", 0)
+    response = await client.post(
+        url=f"{settings.PATH_PREFIX}/practice/{practice.id}/attempt",
+        json={"source_code": "print(4)", "language_id": 1},
+        headers=get_user_authorization_header(user, password),
+    )
+    assert response.status_code == 429
+    assert cache_lookups == []
+
+
+async def test_hidden_test_output_is_shown_only_to_teachers(client, session):
+    user, password, practice = await create_attempt_context(session)
+    attempt = await create_tested_attempt(session, user, practice)
+    token = await session.scalar(select(Submission.token).where(Submission.attempt_id == attempt.id))
+    url = f"{settings.PATH_PREFIX}/practice/{practice.id}/attempt/{attempt.id}/submission/{token}/output"
+
+    response = await client.get(url=url, headers=get_user_authorization_header(user, password))
+    assert response.status_code == 200
+    assert response.json() == {"stdout": None, "stderr": None, "compile_output": None, "message": "Wrong Answer"}
+
+    teacher, teacher_password = await create_test_user(session, is_teacher=True)
+    session.add(Participation(user_id=teacher.id, course_id=practice.course_id))
+    await session.commit()
+    response = await client.get(url=url, headers=get_user_authorization_header(teacher, teacher_password))
+    assert response.status_code == 200
+    assert response.json()["stdout"] == "5"
+
+
+async def test_output_of_another_student_is_forbidden(client, session):
+    user, password, practice = await create_attempt_context(session)
+    attempt = await create_tested_attempt(session, user, practice)
+    token = await session.scalar(select(Submission.token).where(Submission.attempt_id == attempt.id))
+    student, student_password = await create_test_user(session)
+    session.add(Participation(user_id=student.id, course_id=practice.course_id))
+    await session.commit()
+
+    response = await client.get(
+        url=f"{settings.PATH_PREFIX}/practice/{practice.id}/attempt/{attempt.id}/submission/{token}/output",
+        headers=get_user_authorization_header(student, student_password),
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("meta", [
+    {"dispatch_id": str(uuid4())},
+    # Marker would let program forge result lines of single run harness
+    {"run_token": str(uuid4()), "run_marker": uuid4().hex},
+    # Attempt of another student with the same code
+    {"verdict_key": "0" * 64, "reused_from": str(uuid4())},
+])
+async def test_attempts_do_not_show_dispatch_state(client, session, meta):
+    user, password, practice = await create_attempt_context(session)
+    attempt = await create_tested_attempt(session, user, practice)
+    attempt.meta = meta
+    await session.commit()
+
+    response = await client.get(
+        url=f"{settings.PATH_PREFIX}/practice/{practice.id}/attempt",
+        headers=get_user_authorization_header(user, password),
+    )
+    assert response.status_code == 200
+    [attempt_out] = response.json()["results"]
+    assert attempt_out["id"] == str(attempt.id)
+    assert attempt_out["meta"] == {}
@@ -0,0 +1,139 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from redis.asyncio import Redis
+
+from app.config import settings
+from app.utils import backpressure
+from app.utils.backpressure import (
+    NODE_UNAVAILABLE,
+    get_runner_queue_size,
+    get_runner_headroom,
+    reserve_runner_node,
+    release_runner_node,
+)
+from app.utils.limiter import RedisSemaphore
+
+
+NODES = ["http://runner-1:2358", "http://runner-2:2358"]
+
+
+@pytest.fixture
+async def redis(monkeypatch):
+    """Redis of test environment, keys of every test have their own prefix"""
+    client = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB)
+    prefix = uuid4().hex
+    monkeypatch.setattr(backpressure, "RUNNER_QUEUE_SIZE_KEY", f"{prefix}:{backpressure.RUNNER_QUEUE_SIZE_KEY}")
+    monkeypatch.setattr(backpressure, "get_async_redis_client", lambda: client)
+    monkeypatch.setattr(backpressure, "get_judge0_nodes", lambda: NODES)
+    monkeypatch.setattr(settings, "DISPATCH_RUNNER_QUEUE_LIMIT", 10)
+    monkeypatch.setattr(settings, "DISPATCH_QUEUE_PROBE_INTERVAL", 60)
+    client.prefix = prefix
+    yield client
+    keys = await client.keys(f"{prefix}:*")
+    if keys:
+        await client.delete(*keys)
+    await client.aclose()
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Queue size reported by runner node, None if node is unreachable"""
+    sizes = {node: 0 for node in NODES}
+    calls = []
+
+    async def probe_queue_size(client, node):
+        calls.append(node)
+        return sizes[node]
+
+    monkeypatch.setattr(backpressure, "probe_queue_size", probe_queue_size)
+    return sizes, calls
+
+
+async def test_queue_size_is_probed_once_per_interval(redis, probes):
+    sizes, calls = probes
+    sizes[NODES[0]] = 4
+    assert await get_runner_queue_size(NODES[0]) == 4
+    sizes[NODES[0]] = 7
+    assert await get_runner_queue_size(NODES[0]) == 4
+    assert calls == [NODES[0]]
+
+
+async def test_unavailable_node_is_cached(redis, probes):
+    sizes, calls = probes
+    sizes[NODES[1]] = None
+    assert await get_runner_queue_size(NODES[1]) is None
+    assert await get_runner_queue_size(NODES[1]) is None
+    assert calls == [NODES[1]]
+    key = backpressure.RUNNER_QUEUE_SIZE_KEY.format(node=NODES[1])
+    assert int(await redis.get(key)) == NODE_UNAVAILABLE
+    # Reservation does not make unavailable node available
+    await backpressure.add_to_runner_queue_size(NODES[1], 3)
+    assert int(await redis.get(key)) == NODE_UNAVAILABLE
+
+
+async def test_headroom_of_available_nodes(redis, probes):
+    sizes, _ = probes
+    sizes[NODES[0]] = 4
+    sizes[NODES[1]] = None
+    assert await get_runner_headroom() == 6
+    sizes[NODES[0]] = 10
+    await redis.delete(backpressure.RUNNER_QUEUE_SIZE_KEY.format(node=NODES[0]))
+    assert await get_runner_headroom() == 0
+
+
+async def test_concurrent_reservations_spread_over_nodes(redis, probes):
+    sizes, _ = probes
+    sizes[NODES[1]] = 1
+    await get_runner_headroom()
+    picked = await asyncio.gather(*(reserve_runner_node(3) for _ in range(4)))
+    assert sorted(picked) == sorted([(NODES[0], 3), (NODES[0], 3), (NODES[1], 3), (NODES[1], 3)])
+    assert await get_runner_queue_size(NODES[0]) == 6
+    assert await get_runner_queue_size(NODES[1]) == 7
+    # Queues are full after 7 more tests
+    assert await reserve_runner_node(4) == (NODES[0], 4)
+    assert await reserve_runner_node(3) == (NODES[1], 3)
+    assert await reserve_runner_node(1) is None
+    await release_runner_node(NODES[1], 3)
+    assert await reserve_runner_node(1) == (NODES[1], 1)
+
+
+async def test_reservation_does_not_overfill_queue(redis, probes):
+    sizes, _ = probes
+    sizes[NODES[0]] = 8
+    sizes[NODES[1]] = 9
+    assert await reserve_runner_node(40) == (NODES[0], 2)
+    assert await get_runner_queue_size(NODES[0]) == 10
+    assert await reserve_runner_node(40) == (NODES[1], 1)
+    assert await reserve_runner_node(1) is None
+
+
+async def test_full_queue_is_skipped_until_next_probe(redis, probes):
+    await get_runner_headroom()
+    await backpressure.mark_runner_queue_full(NODES[0])
+    assert await get_runner_queue_size(NODES[0]) == 10
+    assert await reserve_runner_node(1) == (NODES[1], 1)
+    # Unprobed node is not marked
+    await redis.delete(backpressure.RUNNER_QUEUE_SIZE_KEY.format(node=NODES[0]))
+    await backpressure.mark_runner_queue_full(NODES[0])
+    assert await redis.get(backpressure.RUNNER_QUEUE_SIZE_KEY.format(node=NODES[0])) is None
+
+
+async def test_semaphore_limits_holders(redis):
+    semaphore = RedisSemaphore(redis=redis, key=f"{redis.prefix}:slots", limit=2, lease_seconds=60)
+    first = await semaphore.acquire()
+    second = await semaphore.acquire()
+    assert first and second and first != second
+    assert await semaphore.acquire() is None
+    assert await semaphore.count() == 2
+    await semaphore.release(first)
+    assert await semaphore.acquire() is not None
+
+
+async def test_semaphore_lease_of_crashed_holder_expires(redis):
+    semaphore = RedisSemaphore(redis=redis, key=f"{redis.prefix}:slots", limit=1, lease_seconds=0.1)
+    assert await semaphore.acquire() is not None
+    assert await semaphore.acquire() is None
+    await asyncio.sleep(0.2)
+    assert await semaphore.acquire() is not None
@@ -0,0 +1,184 @@
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+from sqlalchemy import select, delete
+
+from app.db import Attempt, Practice, Submission, SubmissionStatus
+from app.schemas.callback_server import CallbackServerRequest
+from app.utils.verdict import apply_submission_result, apply_submission_results
+from app.workers.dispatcher import start_dispatch_try, get_remaining_tests
+from tests.utils import (
+    create_test_user,
+    create_test_course,
+    create_test_practice,
+    add_testcase_to_practice,
+)
+
+
+def make_result(token, status_id=3):
+    return CallbackServerRequest(
+        stdout="4",
+        time=0.01,
+        memory=1024,
+        stderr=None,
+        token=token,
+        compile_output=None,
+        message=None,
+        status={"id": status_id, "description": ""},
+    )
+
+
+async def create_dispatched_attempt(session, tests=2):
+    user, _ = await create_test_user(session, is_teacher=True)
+    course = await create_test_course(session)
+    practice = await create_test_practice(session, course, user)
+    testcases = [await add_testcase_to_practice(session, practice, True) for _ in range(tests)]
+    attempt = Attempt(
+        language_id=1,
+        meta={"dispatch_id": str(uuid4())},
+        sent_time=datetime.now(timezone.utc),
+        author_id=user.id,
+        practice_id=practice.id,
+        status=SubmissionStatus.IN_QUEUE,
+        tests_needed=tests,
+        tests_completed=0,
+    )
+    session.add(attempt)
+    await session.flush()
+    tokens = [uuid4() for _ in testcases]
+    session.add_all(
+        Submission(
+            token=token,
+            status=SubmissionStatus.IN_QUEUE,
+            time=0,
+            memory=0,
+            attempt_id=attempt.id,
+            testcase_id=testcase.id,
+        )
+        for token, testcase in zip(tokens, testcases)
+    )
+    await session.commit()
+    return attempt, tokens, testcases
+
+
+async def get_attempt(session, attempt_id):
+    session.expire_all()
+    return await session.scalar(select(Attempt).where(Attempt.id == attempt_id))
+
+
+async def test_repeated_callback_is_applied_once(session):
+    attempt, tokens, _ = await create_dispatched_attempt(session)
+
+    assert await apply_submission_result(session, make_result(tokens[0])) is not None
+    await session.commit()
+    assert await apply_submission_result(session, make_result(tokens[0])) is None
+    await session.commit()
+    attempt = await get_attempt(session, attempt.id)
+    assert attempt.tests_completed == 1
+    assert attempt.status == SubmissionStatus.IN_QUEUE
+
+    await apply_submission_result(session, make_result(tokens[1], status_id=4))
+    await session.commit()
+    assert await apply_submission_result(session, make_result(tokens[1])) is None
+    await session.commit()
+    attempt = await get_attempt(session, attempt.id)
+    assert attempt.tests_completed == 2
+    assert attempt.status == SubmissionStatus.WRONG_ANSWER
+
+
+async def test_callback_before_dispatcher_saved_submission(session):
+    attempt, tokens, testcases = await create_dispatched_attempt(session)
+    await session.execute(delete(Submission).where(Submission.token == tokens[0]))
+    await session.commit()
+    token = uuid4()
+    dispatch_id = UUID(attempt.meta["dispatch_id"])
+
+    await apply_submission_result(session, make_result(token), attempt.id, testcases[0].id, dispatch_id)
+    await session.commit()
+    assert await apply_submission_result(
+        session, make_result(token), attempt.id, testcases[0].id, dispatch_id
+    ) is None
+    await session.commit()
+    submission = await session.get(Submission, token)
+    assert submission.status == SubmissionStatus.ACCEPTED
+    assert submission.testcase_id == testcases[0].id
+    assert (await get_attempt(session, attempt.id)).tests_completed == 1
+
+
+async def test_late_callback_of_failed_dispatch_try(session):
+    attempt, tokens, testcases = await create_dispatched_attempt(session)
+    await session.execute(delete(Submission).where(Submission.attempt_id == attempt.id))
+    await session.commit()
+    failed_try = UUID(attempt.meta["dispatch_id"])
+
+    # Runner accepted the first test of partly failed try, its result came before the next try
+    orphan = uuid4()
+    await apply_submission_result(session, make_result(orphan), attempt.id, testcases[0].id, failed_try)
+    await session.commit()
+    attempt = await get_attempt(session, attempt.id)
+    assert await start_dispatch_try(session, attempt) is not None
+    assert [testcase.id for testcase in await get_remaining_tests(session, attempt.id, testcases)] == [
+        testcases[1].id
+    ]
+    await session.commit()
+
+    # The second test was accepted by runner too, but its callback came after the next try started
+    late = uuid4()
+    assert await apply_submission_result(session, make_result(late), attempt.id, testcases[1].id, failed_try) is None
+    await session.commit()
+    assert await session.get(Submission, late) is None
+    attempt = await get_attempt(session, attempt.id)
+    assert attempt.tests_completed == 1
+    assert attempt.status == SubmissionStatus.IN_QUEUE
+
+
+async def test_retried_callbacks_of_orphaned_tokens_are_dropped(session):
+    attempt, tokens, testcases = await create_dispatched_attempt(session)
+    failed_try = UUID(attempt.meta["dispatch_id"])
+    assert await start_dispatch_try(session, attempt) is not None
+    await session.commit()
+
+    orphans = [uuid4() for _ in testcases]
+    results = [
+        (make_result(token), attempt.id, testcase.id, failed_try)
+        for token, testcase in zip(orphans, testcases)
+    ]
+    for _ in range(2):
+        attempts, not_ready = await apply_submission_results(session, results)
+        await session.commit()
+        # Orphaned result is not retried: reconciler will never know its token
+        assert attempts == [] and not_ready == set()
+    for token, testcase in zip(orphans, testcases):
+        assert await apply_submission_result(
+            session, make_result(token), attempt.id, testcase.id, failed_try
+        ) is None
+        await session.commit()
+
+    assert (await session.scalars(select(Submission.token).where(Submission.token.in_(orphans)))).all() == []
+    assert (await get_attempt(session, attempt.id)).tests_completed == 0
+
+
+async def test_late_callback_of_skipped_test_is_dropped(session):
+    attempt, tokens, testcases = await create_dispatched_attempt(session)
+    practice = await session.get(Practice, attempt.practice_id)
+    practice.fail_fast = True
+    # The second test was sent, but dispatcher has not saved its submission yet
+    await session.execute(delete(Submission).where(Submission.token == tokens[1]))
+    await session.commit()
+
+    await apply_submission_result(session, make_result(tokens[0], status_id=4))
+    await session.commit()
+    await apply_submission_result(
+        session, make_result(tokens[1]), attempt.id, testcases[1].id, UUID(attempt.meta["dispatch_id"])
+    )
+    await session.commit()
+
+    statuses = (await session.scalars(
+        select(Submission.status).
+        where(Submission.attempt_id == attempt.id).
+        where(Submission.testcase_id == testcases[1].id)
+    )).all()
+    assert statuses == [SubmissionStatus.SKIPPED]
+    attempt = await get_attempt(session, attempt.id)
+    assert attempt.status == SubmissionStatus.WRONG_ANSWER
+    assert attempt.status_counts == {SubmissionStatus.WRONG_ANSWER: 1, SubmissionStatus.SKIPPED: 1}
@@ -0,0 +1,56 @@
+from uuid import uuid4
+
+import pytest
+
+from app.config import settings
+from app.db import User
+from app.utils import auth
+from app.utils.auth import authenticate_basic, verified_credentials, auth_statistics
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_state():
+    """Credentials cache and statistics are process-wide"""
+    verified_credentials.clear()
+    auth_statistics.clear()
+    yield
+    verified_credentials.clear()
+    auth_statistics.clear()
+
+
+class FakeSession:
+    def __init__(self, user):
+        self.user = user
+
+    async def get(self, model, ident):
+        return self.user if self.user and self.user.id == ident else None
+
+
+async def test_verified_credentials_skip_password_check(monkeypatch):
+    monkeypatch.setattr(settings, "USER_CACHE_ENABLED", False)
+    user = User(id=uuid4(), username="student", password_hash=b"hash-1")
+    checks = []
+
+    async def authenticate(username, password, session, client_ip=None):
+        checks.append(password)
+        return session.user if password == "right" else None
+
+    monkeypatch.setattr(auth, "authenticate", authenticate)
+    session = FakeSession(user)
+    assert await authenticate_basic("Basic a", "student", "right", session) is user
+    assert await authenticate_basic("Basic a", "student", "right", session) is user
+    assert checks == ["right"]
+    assert auth_statistics["credentials_cache_hits"] == 1
+    # Plaintext header is not a key
+    assert "Basic a" not in verified_credentials
+    # Wrong password is checked every time
+    assert await authenticate_basic("Basic b", "student", "wrong", session) is None
+    assert await authenticate_basic("Basic b", "student", "wrong", session) is None
+    assert checks == ["right", "wrong", "wrong"]
+    # Changed password invalidates cached credentials
+    user.password_hash = b"hash-2"
+    assert await authenticate_basic("Basic a", "student", "right", session) is user
+    assert checks == ["right", "wrong", "wrong", "right"]
+    # So does user deletion
+    session.user = None
+    assert await authenticate_basic("Basic a", "student", "right", session) is None
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.config import settings
+from app.utils import auth
+from app.utils.auth import (
+    PasswordHashingBusy,
+    run_password_job,
+    hash_password_async,
+    verify_password_async,
+    get_auth_statistics,
+)
+
+
+async def test_password_is_hashed_outside_event_loop():
+    password_hash = await hash_password_async("123")
+    assert await verify_password_async("123", password_hash)
+    assert not await verify_password_async("124", password_hash)
+    thread_name = await run_password_job(lambda: threading.current_thread().name)
+    assert thread_name.startswith("password-hashing")
+
+
+async def test_full_queue_rejects_jobs(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASHING_WORKERS", 1)
+    monkeypatch.setattr(settings, "PASSWORD_HASHING_QUEUE_LIMIT", 1)
+    auth.shutdown_password_executor()
+    release = threading.Event()
+    jobs = [asyncio.create_task(run_password_job(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    assert get_auth_statistics()["password_queue"] == 1
+    with pytest.raises(PasswordHashingBusy):
+        await run_password_job(release.wait)
+    release.set()
+    await asyncio.gather(*jobs)
+    assert get_auth_statistics()["password_jobs"] == 0
+    auth.shutdown_password_executor()
+
+
+async def test_cancelled_request_counts_job_until_it_finishes(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASHING_WORKERS", 1)
+    monkeypatch.setattr(settings, "PASSWORD_HASHING_QUEUE_LIMIT", 0)
+    auth.shutdown_password_executor()
+    release = threading.Event()
+    job = asyncio.create_task(run_password_job(release.wait))
+    await asyncio.sleep(0.01)
+    job.cancel()
+    await asyncio.gather(job, return_exceptions=True)
+    # Hashing thread is still busy
+    assert get_auth_statistics()["password_jobs"] == 1
+    with pytest.raises(PasswordHashingBusy):
+        await run_password_job(release.wait)
+    release.set()
+    auth.shutdown_password_executor()
+    assert get_auth_statistics()["password_jobs"] == 0
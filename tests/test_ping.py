@@ -0,0 +1,28 @@
+from app.config import settings
+from tests.utils import create_test_user, get_user_authorization_header
+
+
+async def test_ping_reports_breakers(client):
+    response = await client.get(url=f"{settings.PATH_PREFIX}/health_check/ping")
+    assert response.status_code == 200
+    assert set(response.json()["judge0_breakers"]) == {"open", "total"}
+
+
+async def test_metrics_require_admin(client, session):
+    response = await client.get(url=f"{settings.PATH_PREFIX}/health_check/metrics")
+    assert response.status_code == 422
+
+    user, password = await create_test_user(session, is_teacher=True)
+    response = await client.get(
+        url=f"{settings.PATH_PREFIX}/health_check/metrics",
+        headers=get_user_authorization_header(user, password),
+    )
+    assert response.status_code == 403
+
+    admin, password = await create_test_user(session, is_admin=True)
+    response = await client.get(
+        url=f"{settings.PATH_PREFIX}/health_check/metrics",
+        headers=get_user_authorization_header(admin, password),
+    )
+    assert response.status_code == 200
+    assert "judge0_pool" in response.json()
@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.utils import rate_limit
+from app.utils.rate_limit import (
+    AuthRateLimited,
+    reserve_auth_attempt,
+    release_auth_attempt,
+    get_client_ip,
+    get_auth_rate_limit_statistics,
+)
+
+
+class FakePipeline:
+    """Pipelined limiter commands, executed together like MULTI"""
+
+    def __init__(self, sets):
+        self.sets = sets
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def zremrangebyscore(self, key, low, high):
+        self.commands.append(lambda: len([
+            self.sets.setdefault(key, {}).pop(member)
+            for member, score in list(self.sets.get(key, {}).items())
+            if low <= score <= high
+        ]))
+
+    def zcard(self, key):
+        self.commands.append(lambda: len(self.sets.get(key, {})))
+
+    def zadd(self, key, mapping):
+        self.commands.append(lambda: self.sets.setdefault(key, {}).update(mapping))
+
+    def zrem(self, key, member):
+        self.commands.append(lambda: self.sets.get(key, {}).pop(member, None))
+
+    def expire(self, key, seconds):
+        self.commands.append(lambda: True)
+
+    async def execute(self):
+        # Let concurrent requests queue their transactions
+        await asyncio.sleep(0)
+        return [command() for command in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.sets = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.sets)
+
+
+async def fail_attempt(username, client_ip):
+    await reserve_auth_attempt(username, client_ip)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(rate_limit, "get_async_redis_client", lambda: redis)
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_PER_USERNAME", 2)
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_PER_IP", 3)
+    return redis
+
+
+async def test_failures_per_username_are_limited(redis):
+    for _ in range(2):
+        await fail_attempt("student", "10.0.0.1")
+    with pytest.raises(AuthRateLimited):
+        await reserve_auth_attempt("student", "10.0.0.2")
+    # Another user from the same address is not limited yet
+    await reserve_auth_attempt("teacher", "10.0.0.1")
+    assert get_auth_rate_limit_statistics()["rejected_by_username"] >= 1
+
+
+async def test_failures_per_ip_are_limited(redis):
+    for username in ("a", "b", "c"):
+        await fail_attempt(username, "10.0.0.3")
+    with pytest.raises(AuthRateLimited):
+        await reserve_auth_attempt("d", "10.0.0.3")
+    await reserve_auth_attempt("d", "10.0.0.4")
+
+
+async def test_old_failures_leave_window(redis, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_WINDOW", 60)
+    for _ in range(2):
+        await fail_attempt("student", None)
+    monkeypatch.setattr(rate_limit.time, "time", lambda: 10 ** 10)
+    await reserve_auth_attempt("student", None)
+
+
+async def test_concurrent_attempts_do_not_pass_limit_together(redis):
+    results = await asyncio.gather(
+        *(reserve_auth_attempt("student", None) for _ in range(5)),
+        return_exceptions=True,
+    )
+    assert sum(not isinstance(result, AuthRateLimited) for result in results) == 2
+    # Rejected attempts are not counted
+    assert len(redis.sets["auth:failures:user:student"]) == 2
+
+
+async def test_successful_attempt_is_not_counted(redis):
+    for _ in range(3):
+        attempt_id = await reserve_auth_attempt("student", None)
+        await release_auth_attempt("student", None, attempt_id)
+    await reserve_auth_attempt("student", None)
+
+
+def test_client_ip_header_is_trusted_only_from_proxy(monkeypatch):
+    monkeypatch.setattr(settings, "CLIENT_IP_HEADER", "X-Real-IP")
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", "172.16.0.0/12, 10.0.0.1")
+    headers = {"X-Real-IP": "1.2.3.4"}
+    assert get_client_ip(SimpleNamespace(client=SimpleNamespace(host="172.18.0.5"), headers=headers)) == "1.2.3.4"
+    assert get_client_ip(SimpleNamespace(client=SimpleNamespace(host="10.0.0.1"), headers=headers)) == "1.2.3.4"
+    assert get_client_ip(SimpleNamespace(client=SimpleNamespace(host="8.8.8.8"), headers=headers)) == "8.8.8.8"
+    assert get_client_ip(SimpleNamespace(client=SimpleNamespace(host="10.0.0.1"), headers={})) == "10.0.0.1"
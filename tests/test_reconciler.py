@@ -0,0 +1,158 @@
+from base64 import b64encode
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+from httpx import AsyncClient, MockTransport, Response
+from sqlalchemy import select
+
+from app.config import settings
+from app.db import Attempt, Submission, SubmissionStatus
+from app.schemas.callback_server import CallbackServerRequest
+from app.utils.judge0 import get_submissions
+from app.workers import reconciler
+from app.workers.reconciler import group_runner_tokens, reconcile_stale
+from tests.utils import create_test_user, create_test_course, create_test_practice, add_testcase_to_practice
+
+
+NODE = "http://runner-reconciler:2358"
+
+
+def make_accepted_result(token: str) -> dict:
+    return {
+        "token": token,
+        "status": {"id": 3, "description": "Accepted"},
+        "time": "0.012",
+        "memory": 1024,
+        "stdout": b64encode(b"4\n").decode(),
+        "stderr": None,
+        "compile_output": None,
+        "message": None,
+    }
+
+
+async def test_get_submissions(monkeypatch):
+    monkeypatch.setattr(settings, "JUDGE0_MAX_BATCH_SIZE", 2)
+    tokens = [str(uuid4()) for _ in range(3)]
+    requested = []
+
+    def handler(request):
+        chunk = request.url.params["tokens"].split(",")
+        requested.append(chunk)
+        return Response(200, json={"submissions": [
+            None if token == tokens[1] else make_accepted_result(token)
+            for token in chunk
+        ]})
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        submissions = await get_submissions(client, tokens, "http://runner:2358")
+    assert requested == [tokens[:2], tokens[2:]]
+    assert submissions[1] is None
+    message = CallbackServerRequest.model_validate(submissions[0])
+    assert message.stdout == "4\n"
+    assert message.time == 0.012
+
+
+async def test_get_submissions_runner_error():
+    async with AsyncClient(transport=MockTransport(lambda request: Response(500))) as client:
+        assert await get_submissions(client, [str(uuid4())], "http://runner-error:2358") is None
+
+
+def test_group_runner_tokens():
+    attempt_id = uuid4()
+    per_test, single_run = uuid4(), uuid4()
+    rows = [
+        SimpleNamespace(token=per_test, node="http://runner-1:2358", attempt_id=uuid4(), meta={}),
+        SimpleNamespace(token=uuid4(), node="http://runner-2:2358", attempt_id=attempt_id, meta={"run_token": "run"}),
+        SimpleNamespace(token=single_run, node="http://runner-2:2358", attempt_id=attempt_id, meta={"run_token": "run"}),
+    ]
+    assert group_runner_tokens(rows) == {
+        "http://runner-1:2358": {str(per_test): None},
+        "http://runner-2:2358": {"run": attempt_id},
+    }
+
+
+async def create_stale_attempt(session, tests: int) -> tuple[Attempt, list[Submission]]:
+    """Attempt with tests sent to runner, whose callbacks were lost"""
+    user, _ = await create_test_user(session)
+    course = await create_test_course(session)
+    practice = await create_test_practice(session, course, user)
+    testcases = [await add_testcase_to_practice(session, practice, True) for _ in range(tests)]
+    attempt = Attempt(
+        language_id=1,
+        meta={},
+        sent_time=datetime.now(timezone.utc),
+        author_id=user.id,
+        practice_id=practice.id,
+        status=SubmissionStatus.IN_QUEUE,
+        tests_needed=tests,
+    )
+    session.add(attempt)
+    await session.flush()
+    submissions = [
+        Submission(
+            token=uuid4(),
+            status=SubmissionStatus.IN_QUEUE,
+            time=0,
+            memory=0,
+            attempt_id=attempt.id,
+            testcase_id=testcase.id,
+            node=NODE,
+        )
+        for testcase in testcases
+    ]
+    session.add_all(submissions)
+    await session.commit()
+    return attempt, submissions
+
+
+def use_runner(monkeypatch, results: dict[str, dict | None]):
+    monkeypatch.setattr(settings, "RECONCILER_STALE_AFTER", 0)
+
+    def handler(request):
+        return Response(200, json={"submissions": [
+            results.get(token) for token in request.url.params["tokens"].split(",")
+        ]})
+
+    client = AsyncClient(transport=MockTransport(handler))
+    monkeypatch.setattr(reconciler, "get_judge0_client", lambda: client)
+
+
+async def test_stale_submission_result_is_applied(session, session_factory_async, monkeypatch):
+    attempt, submissions = await create_stale_attempt(session, tests=2)
+    token = str(submissions[0].token)
+    other_token = str(submissions[1].token)
+    # Second test is still running
+    processing = make_accepted_result(other_token) | {"status": {"id": 2, "description": "Processing"}}
+    use_runner(monkeypatch, {token: make_accepted_result(token), other_token: processing})
+
+    assert await reconcile_stale(session_factory_async) == 1
+
+    session.expunge_all()
+    saved = await session.get(Attempt, attempt.id)
+    assert saved.status == SubmissionStatus.IN_QUEUE
+    assert saved.tests_completed == 1
+    assert saved.accepted_count == 1
+    statuses = dict((await session.execute(
+        select(Submission.token, Submission.status).where(Submission.attempt_id == attempt.id)
+    )).all())
+    assert statuses == {
+        submissions[0].token: SubmissionStatus.ACCEPTED,
+        submissions[1].token: SubmissionStatus.IN_QUEUE,
+    }
+
+
+async def test_submission_lost_by_runner_is_service_error(session, session_factory_async, monkeypatch):
+    attempt, submissions = await create_stale_attempt(session, tests=1)
+    use_runner(monkeypatch, {})
+
+    assert await reconcile_stale(session_factory_async) == 1
+
+    session.expunge_all()
+    saved = await session.get(Attempt, attempt.id)
+    assert saved.status == SubmissionStatus.SERVICE_ERROR
+    assert saved.tests_completed == 1
+    assert saved.service_error_count == 1
+    assert await session.scalar(
+        select(Submission.status).where(Submission.token == submissions[0].token)
+    ) == SubmissionStatus.SERVICE_ERROR
@@ -0,0 +1,206 @@
+import json
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient, MockTransport, Response, ConnectError
+
+from app.config import settings
+from app.utils import requests
+from app.utils.requests import (
+    split_into_chunks,
+    send_batch_post,
+    send_post,
+    get_judge0_breaker,
+    get_judge0_client,
+    open_judge0_client,
+    close_judge0_client,
+    get_judge0_pool_statistics,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from app.utils.judge0 import get_judge0_nodes, get_judge0_url, make_submission_payloads, probe_queue_size
+
+
+@pytest.mark.parametrize(
+    "size,chunk_size,excepted",
+    [
+        (0, 20, []),
+        (5, 20, [5]),
+        (20, 20, [20]),
+        (41, 20, [20, 20, 1]),
+    ]
+)
+def test_split_into_chunks(size, chunk_size, excepted):
+    chunks = split_into_chunks(list(range(size)), chunk_size)
+    assert [len(chunk) for chunk in chunks] == excepted
+    assert [item for chunk in chunks for item in chunk] == list(range(size))
+
+
+async def test_send_batch_post():
+    received = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        received.append(body)
+        return Response(201, json=[{"token": item["stdin"]} for item in body["submissions"]])
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        responses = await send_batch_post(
+            client=client,
+            url="http://runner/submissions/batch",
+            jsons=[{"stdin": str(i)} for i in range(45)],
+            batch_size=20,
+        )
+    assert len(received) == 3
+    tokens = [item["token"] for response in responses for item in response.json()]
+    assert tokens == [str(i) for i in range(45)]
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setattr(requests, "judge0_breakers", {})
+    monkeypatch.setattr(settings, "JUDGE0_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(settings, "JUDGE0_RETRIES", 2)
+    monkeypatch.setattr(settings, "JUDGE0_RETRY_BASE_DELAY", 0)
+    return get_judge0_breaker("http://runner:2358")
+
+
+async def test_send_post_retries_overload(breaker):
+    statuses = [503, 201]
+
+    def handler(request):
+        return Response(statuses.pop(0), json={"token": "1"})
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        response = await send_post(client, "http://runner:2358/submissions", {})
+    assert response.status_code == 201
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+async def test_full_queue_does_not_open_breaker(breaker):
+    def handler(request):
+        return Response(503, json={"error": "queue is full"})
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        for _ in range(3):
+            response = await send_post(client, "http://runner:2358/submissions", {})
+            assert response.status_code == 503
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+async def test_breaker_opens_on_failures(breaker):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise ConnectError("Connection refused", request=request)
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        with pytest.raises(CircuitOpenError):
+            await send_post(client, "http://runner:2358/submissions", {})
+        with pytest.raises(CircuitOpenError):
+            await send_post(client, "http://runner:2358/submissions", {})
+    assert len(calls) == 2
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.rejected_total == 2
+
+
+def test_breaker_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    # Only one trial request after reset timeout
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+async def test_interrupted_trial_does_not_wedge_breaker(breaker, monkeypatch):
+    monkeypatch.setattr(breaker, "reset_timeout", 0)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    def handler(request):
+        raise RuntimeError("Trial interrupted")
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        with pytest.raises(RuntimeError):
+            await send_post(client, "http://runner:2358/submissions", {})
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Next request is let through as the new trial
+    assert breaker.allow_request()
+
+
+async def test_breaker_per_node(breaker):
+    def handler(request):
+        if request.url.host == "runner":
+            raise ConnectError("Connection refused", request=request)
+        return Response(201, json={"token": "1"})
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        with pytest.raises(CircuitOpenError):
+            await send_post(client, "http://runner:2358/submissions", {})
+        response = await send_post(client, "http://runner-2:2358/submissions", {})
+    assert response.status_code == 201
+    assert breaker.state == CircuitBreaker.OPEN
+    assert get_judge0_breaker("http://runner-2:2358").state == CircuitBreaker.CLOSED
+    assert requests.get_judge0_breaker_summary() == {"open": 1, "total": 2}
+
+
+async def test_unreachable_node_is_not_probed_until_reset(breaker):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise ConnectError("Connection refused", request=request)
+
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        for _ in range(3):
+            assert await probe_queue_size(client, "http://runner:2358") is None
+    # Probe is not retried and stops at open breaker
+    assert len(calls) == 2
+    assert breaker.is_open()
+
+
+async def test_shared_client_lifecycle():
+    await close_judge0_client()
+    assert get_judge0_pool_statistics() == {}
+    client = get_judge0_client()
+    assert get_judge0_client() is client
+    assert await open_judge0_client() is client
+    assert get_judge0_pool_statistics()["requests_total"] == 0
+
+    await close_judge0_client()
+    assert client.is_closed
+    assert get_judge0_pool_statistics() == {}
+    # Client closed by lifespan is recreated on next use
+    assert get_judge0_client() is not client
+    await close_judge0_client()
+
+
+def test_judge0_nodes(monkeypatch):
+    monkeypatch.setattr(settings, "JUDGE0_NODES", "")
+    assert get_judge0_nodes() == [f"{settings.JUDGE0_HOST}:{settings.JUDGE0_PORT}"]
+    monkeypatch.setattr(settings, "JUDGE0_NODES", "http://runner-1:2358/, http://runner-2:2358")
+    assert get_judge0_nodes() == ["http://runner-1:2358", "http://runner-2:2358"]
+    assert get_judge0_url("/workers", "http://runner-2:2358") == "http://runner-2:2358/workers"
+    assert get_judge0_url("/workers") == "http://runner-1:2358/workers"
+
+
+def test_submission_callback_url():
+    practice = SimpleNamespace(memory_limit=128000, time_limit=1000, network=False, max_threads=1)
+    testcases = [SimpleNamespace(id=i, input="", excepted="") for i in (3, 7)]
+    attempt_id, dispatch_id = uuid4(), uuid4()
+    payloads = make_submission_payloads(practice, testcases, "print(1)", 1, attempt_id, dispatch_id)
+    assert [payload["callback_url"] for payload in payloads] == [
+        f"{settings.CALLBACK_URL}:{settings.APP_PORT}/?attempt_id={attempt_id}&testcase_id={i}&dispatch_id={dispatch_id}"
+        for i in (3, 7)
+    ]
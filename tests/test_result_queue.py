@@ -0,0 +1,39 @@
+from uuid import uuid4
+
+from app.schemas.callback_server import CallbackServerRequest
+from app.utils.result_queue import parse_entry
+
+
+def make_result(token):
+    return CallbackServerRequest(
+        stdout="4",
+        time=0.01,
+        memory=1024,
+        stderr=None,
+        token=token,
+        compile_output=None,
+        message=None,
+        status={"id": 3, "description": "Accepted"},
+    )
+
+
+def test_parse_entry():
+    token, attempt_id, dispatch_id = uuid4(), uuid4(), uuid4()
+    entry = parse_entry(
+        b"1700000000123-0",
+        {
+            b"result": make_result(token).model_dump_json().encode(),
+            b"attempt_id": str(attempt_id).encode(),
+            b"testcase_id": b"7",
+            b"dispatch_id": str(dispatch_id).encode(),
+        },
+    )
+    assert entry.result == make_result(token)
+    assert (entry.attempt_id, entry.testcase_id, entry.dispatch_id) == (attempt_id, 7, dispatch_id)
+    assert entry.queued_at == 1700000000.123
+
+
+def test_parse_broken_entry():
+    entry = parse_entry(b"1-0", {b"result": b"{}"})
+    assert entry.result is None
+    assert entry.attempt_id is None and entry.testcase_id is None and entry.dispatch_id is None
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from app.db import Attempt, AttemptOutbox, SubmissionStatus
+from app.utils.auth import create_user
+from app.workers.scheduler import schedule_outbox
+from tests.utils import create_test_course, create_test_practice
+
+
+async def create_author(session):
+    return await create_user(
+        session=session,
+        password="123",
+        username=f"test_user_{uuid4().hex}",
+        display_name="test_display_name",
+        is_teacher=False,
+        is_admin=False,
+        email="a@mail.com",
+    )
+
+
+async def add_to_outbox(session, practice, author, deadline, **kwargs) -> AttemptOutbox:
+    attempt = Attempt(
+        language_id=1,
+        meta={},
+        sent_time=datetime.now(timezone.utc),
+        author_id=author.id,
+        practice_id=practice.id,
+        status=SubmissionStatus.IN_QUEUE,
+    )
+    session.add(attempt)
+    await session.flush()
+    row = AttemptOutbox(
+        attempt_id=attempt.id,
+        source_code="",
+        author_id=author.id,
+        course_id=practice.course_id,
+        deadline=deadline,
+        **kwargs,
+    )
+    session.add(row)
+    await session.commit()
+    return row
+
+
+async def get_schedule(session) -> list[int]:
+    return list(await session.scalars(schedule_outbox(limit=100)))
+
+
+async def test_courses_are_interleaved_by_weight(session):
+    author = await create_author(session)
+    heavy_course = await create_test_course(session)
+    heavy_course.dispatch_weight = 2
+    light_course = await create_test_course(session)
+    heavy_practice = await create_test_practice(session, heavy_course, author)
+    light_practice = await create_test_practice(session, light_course, author)
+    heavy_author = await create_author(session)
+    light_author = await create_author(session)
+    deadline = datetime.now(timezone.utc) + timedelta(days=7)
+
+    light_deadline = deadline + timedelta(hours=1)
+    light = [await add_to_outbox(session, light_practice, light_author, light_deadline) for _ in range(2)]
+    heavy = [await add_to_outbox(session, heavy_practice, heavy_author, deadline) for _ in range(4)]
+
+    # Virtual time of k-th attempt is k / weight, earlier deadline breaks ties
+    expected = [heavy[0], heavy[1], light[0], heavy[2], heavy[3], light[1]]
+    assert await get_schedule(session) == [row.id for row in expected]
+
+
+async def test_urgent_attempts_go_first(session):
+    author = await create_author(session)
+    course = await create_test_course(session)
+    practice = await create_test_practice(session, course, author)
+    now = datetime.now(timezone.utc)
+
+    demoted = await add_to_outbox(session, practice, author, now - timedelta(days=1), demoted=True)
+    normal = await add_to_outbox(session, practice, author, now + timedelta(days=7))
+    await add_to_outbox(session, practice, author, now + timedelta(days=7), parked=True)
+    await add_to_outbox(session, practice, author, now + timedelta(days=7), locked_until=now + timedelta(minutes=1))
+    urgent = await add_to_outbox(session, practice, author, now + timedelta(minutes=10))
+
+    assert await get_schedule(session) == [urgent.id, normal.id, demoted.id]
@@ -0,0 +1,93 @@
+from base64 import b64encode, b64decode
+from io import BytesIO
+from types import SimpleNamespace
+from zipfile import ZipFile
+
+from app.config.languages import MULTI_FILE_JUDGE0_ID
+from app.db import SubmissionStatus
+from app.utils.single_run import (
+    TestResult,
+    make_single_run_payload,
+    parse_single_run_output,
+    get_test_status,
+    fits_single_run,
+    skip_after_failure,
+)
+
+
+def make_practice(time_limit=1000, fail_fast=False):
+    return SimpleNamespace(memory_limit=128000, time_limit=time_limit, network=False, fail_fast=fail_fast)
+
+
+def make_testcases(count):
+    return [SimpleNamespace(id=i, input=f"{i} + {i}", excepted=str(2 * i)) for i in range(1, count + 1)]
+
+
+def test_single_run_payload():
+    testcases = make_testcases(3)
+    payload = make_single_run_payload(
+        make_practice(), testcases, "print(eval(input()))", 1, "http://callback/run/1", "secret",
+    )
+    assert payload["language_id"] == MULTI_FILE_JUDGE0_ID
+    assert payload["callback_url"] == "http://callback/run/1"
+    with ZipFile(BytesIO(b64decode(payload["additional_files"]))) as archive:
+        names = set(archive.namelist())
+        assert {"run", "compile", "script.py", "tests/1.in", "tests/2.in", "tests/3.in"} <= names
+        assert archive.read("tests/2.in").decode() == "2 + 2"
+        assert archive.read("marker").decode() == "secret"
+        run = archive.read("run").decode()
+        assert "break" not in run
+        # Marker is read by harness, not written into it
+        assert "secret" not in run
+        assert "script.pyc" in run
+
+
+def test_interpreted_language_is_not_compiled():
+    payload = make_single_run_payload(make_practice(), make_testcases(1), "echo 2", 2, "", "secret")
+    with ZipFile(BytesIO(b64decode(payload["additional_files"]))) as archive:
+        assert "compile" not in archive.namelist()
+
+
+def test_single_run_payload_fail_fast():
+    payload = make_single_run_payload(make_practice(fail_fast=True), make_testcases(2), "", 1, "", "secret")
+    with ZipFile(BytesIO(b64decode(payload["additional_files"]))) as archive:
+        assert "break" in archive.read("run").decode()
+
+
+def test_fits_single_run():
+    assert fits_single_run(make_practice(time_limit=1000), make_testcases(10))
+    assert not fits_single_run(make_practice(time_limit=1000), make_testcases(100))
+    assert not fits_single_run(make_practice(), [])
+
+
+def test_parse_single_run_output():
+    stdout = "\n".join([
+        f"secret 1 0 12 {b64encode(b'2').decode()}",
+        "noise",
+        "secret 2 124 1000 ",
+        "secret x 0 1 AA==",
+        # Forged by program
+        f"secret 1 0 1 {b64encode(b'3').decode()}",
+        f"@@test 3 0 1 {b64encode(b'6').decode()}",
+    ])
+    results = parse_single_run_output(stdout, "secret")
+    assert results == {
+        1: TestResult(exit_code=0, time=12, output="2"),
+        2: TestResult(exit_code=124, time=1000, output=""),
+    }
+
+
+def test_get_test_status():
+    assert get_test_status(TestResult(0, 1, "4 \n\n"), "4") == SubmissionStatus.ACCEPTED
+    assert get_test_status(TestResult(0, 1, "5"), "4") == SubmissionStatus.WRONG_ANSWER
+    assert get_test_status(TestResult(124, 1, ""), "4") == SubmissionStatus.TIME_LIMIT_EXCEED
+    assert get_test_status(TestResult(137, 1, ""), "4") == SubmissionStatus.TIME_LIMIT_EXCEED
+    assert get_test_status(TestResult(1, 1, "4"), "4") == SubmissionStatus.RUNTIME_ERROR
+
+
+def test_skip_after_failure():
+    accepted, wrong = SubmissionStatus.ACCEPTED, SubmissionStatus.WRONG_ANSWER
+    assert skip_after_failure([accepted, accepted]) == [accepted, accepted]
+    assert skip_after_failure([accepted, wrong, accepted, wrong]) == [
+        accepted, wrong, SubmissionStatus.SKIPPED, SubmissionStatus.SKIPPED,
+    ]
@@ -0,0 +1,98 @@
+import json
+import subprocess
+import sys
+from uuid import uuid4
+
+from starlette.testclient import TestClient
+
+from app.callback_server import app, read_message
+from app.config import settings
+from app.utils.submission_output import (
+    truncate_text,
+    truncate_output,
+    compress_output,
+    decompress_output,
+    make_output_row,
+)
+
+
+def test_short_output_is_not_truncated():
+    assert truncate_output("answer\n", 16) == b"answer\n"
+
+
+def test_long_output_keeps_head_and_tail():
+    output = "a" * 100 + "b" * 100
+    truncated = truncate_output(output, 20).decode()
+    assert truncated.startswith("a" * 10)
+    assert truncated.endswith("b" * 10)
+    assert "180 bytes truncated" in truncated
+
+
+def test_output_roundtrip():
+    output = "line\n" * 1000
+    compressed = compress_output(output)
+    assert len(compressed) < len(output)
+    assert decompress_output(compressed) == output
+    assert compress_output("") is None
+    assert decompress_output(None) is None
+
+
+def test_empty_output_is_not_stored(monkeypatch):
+    monkeypatch.setattr(settings, "SUBMISSION_OUTPUT_ENABLED", True)
+    token = uuid4()
+    assert make_output_row(token, {"stdout": "", "stderr": None}) is None
+    row = make_output_row(token, {"stdout": "42"})
+    assert row["token"] == token
+    assert decompress_output(row["stdout"]) == "42"
+    assert row["compile_output"] is None
+
+
+def test_text_truncation():
+    assert truncate_text("short", 10) == "short"
+    truncated = truncate_text("x" * 50 + "y" * 50, 10)
+    assert truncated.startswith("xxxxx") and truncated.endswith("yyyyy")
+    assert "90 characters truncated" in truncated
+
+
+def test_too_large_callback_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "CALLBACK_MAX_BODY_SIZE", 100)
+    response = TestClient(app).put("/", content=b"{" + b" " * 200 + b"}")
+    assert response.status_code == 413
+
+
+async def test_output_is_truncated_before_validation(monkeypatch):
+    monkeypatch.setattr(settings, "SUBMISSION_OUTPUT_MAX_SIZE", 10)
+    body = json.dumps({
+        "stdout": "1" * 1000,
+        "stderr": "2" * 1000,
+        "time": None,
+        "memory": None,
+        "token": str(uuid4()),
+        "compile_output": None,
+        "message": None,
+        "status": None,
+    }).encode()
+
+    class Request:
+        headers = {}
+
+        async def stream(self):
+            yield body[:100]
+            yield body[100:]
+
+    message = await read_message(Request())
+    assert message.stdout.startswith("11111") and len(message.stdout) < 100
+    message = await read_message(Request(), full_fields=("stdout",))
+    assert message.stdout == "1" * 1000
+    assert len(message.stderr) < 100
+
+
+def test_callback_server_does_not_import_api():
+    modules = subprocess.run(
+        [sys.executable, "-c", "import sys, app.callback_server; print(*sys.modules)"],
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    assert "app.endpoints" not in modules
+    assert "app.utils.auth" not in modules
+    assert "app.workers.dispatcher" not in modules
+    assert "app.schemas.attempt" not in modules
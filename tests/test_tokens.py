@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.dependencies import auth as auth_dependencies
+from app.dependencies.auth import auth_dependency
+from app.endpoints.auth import logout, refresh_token
+from app.schemas.auth import RefreshIn
+from app.utils import tokens
+from app.utils.tokens import ACCESS_TOKEN, REFRESH_TOKEN, encode_token, decode_token, issue_tokens
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+
+class FakeSession:
+    def __init__(self, user):
+        self.user = user
+
+    async def get(self, model, ident):
+        return self.user if self.user.id == ident else None
+
+
+@pytest.fixture
+def user(monkeypatch):
+    user = SimpleNamespace(id=uuid4())
+    redis = FakeRedis()
+
+    async def get_cached_user(session, user_id):
+        return await session.get(None, user_id)
+
+    monkeypatch.setattr(tokens, "get_async_redis_client", lambda: redis)
+    monkeypatch.setattr(auth_dependencies, "get_cached_user", get_cached_user)
+    return user
+
+
+async def authorize(access_token, user):
+    return await auth_dependency(f"Bearer {access_token}", FakeSession(user), request=None)
+
+
+def test_issued_tokens_are_verified():
+    user_id = uuid4()
+    access_token, refresh_token = issue_tokens(user_id)
+    access_claims = decode_token(access_token, ACCESS_TOKEN)
+    refresh_claims = decode_token(refresh_token, REFRESH_TOKEN)
+    assert access_claims["sub"] == refresh_claims["sub"] == str(user_id)
+    assert access_claims["sid"] == refresh_claims["sid"]
+    # Refresh token is not accepted as access token and vice versa
+    assert decode_token(refresh_token, ACCESS_TOKEN) is None
+    assert decode_token(access_token, REFRESH_TOKEN) is None
+
+
+def test_refreshed_tokens_keep_session():
+    access_token, _ = issue_tokens(uuid4(), "session")
+    assert decode_token(access_token, ACCESS_TOKEN)["sid"] == "session"
+
+
+def test_invalid_tokens_are_rejected(monkeypatch):
+    access_token, _ = issue_tokens(uuid4())
+    payload, signature = access_token.split(".")
+    forged = encode_token({"sub": str(uuid4()), "sid": "x", "typ": ACCESS_TOKEN, "exp": 2 ** 40})
+    assert decode_token(f"{forged.split('.')[0]}.{signature}", ACCESS_TOKEN) is None
+    assert decode_token(payload, ACCESS_TOKEN) is None
+    assert decode_token("not a token", ACCESS_TOKEN) is None
+    assert decode_token("", ACCESS_TOKEN) is None
+    expired = encode_token({"sub": str(uuid4()), "sid": "x", "typ": ACCESS_TOKEN, "exp": 1})
+    assert decode_token(expired, ACCESS_TOKEN) is None
+    monkeypatch.setattr(settings, "AUTH_SECRET_KEY", "another")
+    assert decode_token(access_token, ACCESS_TOKEN) is None
+
+
+async def test_bearer_token_authenticates_user(user):
+    access_token, refresh = issue_tokens(user.id)
+    assert await authorize(access_token, user) is user
+    for token in (refresh, f"{access_token}x", issue_tokens(uuid4())[0]):
+        with pytest.raises(HTTPException) as error:
+            await authorize(token, user)
+        assert error.value.status_code == 401
+
+
+async def test_refresh_token_reuse_revokes_session(user):
+    access_token, refresh = issue_tokens(user.id)
+    session = FakeSession(user)
+    refreshed = await refresh_token(RefreshIn(refresh_token=refresh), session)
+    assert await authorize(refreshed.token, user) is user
+    # Stolen refresh token is used again
+    with pytest.raises(HTTPException):
+        await refresh_token(RefreshIn(refresh_token=refresh), session)
+    for token in (access_token, refreshed.token):
+        with pytest.raises(HTTPException):
+            await authorize(token, user)
+    with pytest.raises(HTTPException):
+        await refresh_token(RefreshIn(refresh_token=refreshed.refresh_token), session)
+
+
+async def test_logout_revokes_session(user):
+    access_token, refresh = issue_tokens(user.id)
+    other_access_token, _ = issue_tokens(user.id)
+    await logout(RefreshIn(refresh_token=refresh))
+    with pytest.raises(HTTPException):
+        await authorize(access_token, user)
+    with pytest.raises(HTTPException):
+        await refresh_token(RefreshIn(refresh_token=refresh), FakeSession(user))
+    # Other sessions of user are kept
+    assert await authorize(other_access_token, user) is user
+
+
+def test_default_secret_key_is_refused(monkeypatch):
+    monkeypatch.setenv("ENV", "production")
+    monkeypatch.setattr(settings, "AUTH_SECRET_KEY", "change-me")
+    with pytest.raises(RuntimeError):
+        settings.check_auth_secret_key()
+    monkeypatch.setattr(settings, "AUTH_SECRET_KEY", "0" * 64)
+    settings.check_auth_secret_key()
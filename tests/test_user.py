@@ -4,7 +4,7 @@ import pytest
 from sqlalchemy import select
 
 from app.db.models import User
-from app.utils import authenticate, create_user
+from app.utils.auth import authenticate, create_user
 from app.config import settings
 
 
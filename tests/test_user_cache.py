@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.config import settings
+from app.db import User
+from app.utils import user_cache
+from app.utils.user_cache import (
+    get_cached_user,
+    get_cached_user_with_fingerprint,
+    get_password_fingerprint,
+    invalidate_cached_users,
+    users_committed,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_local_users():
+    """Local user cache is process-wide"""
+    user_cache._local_users.clear()
+    yield
+    user_cache._local_users.clear()
+
+
+class FakeSession:
+    def __init__(self, user):
+        self.user = user
+        self.queries = 0
+
+    async def get(self, model, ident):
+        self.queries += 1
+        return self.user
+
+    async def merge(self, user, load=True):
+        assert not load
+        return user
+
+
+async def test_cached_user_skips_database(monkeypatch):
+    redis = {}
+
+    async def get_redis_user(user_id):
+        return redis.get(user_id)
+
+    async def store_redis_user(user_id, data):
+        redis[user_id] = data
+
+    monkeypatch.setattr(settings, "USER_CACHE_ENABLED", True)
+    monkeypatch.setattr(user_cache, "get_redis_user", get_redis_user)
+    monkeypatch.setattr(user_cache, "store_redis_user", store_redis_user)
+
+    async def delete(*keys):
+        redis.clear()
+
+    monkeypatch.setattr(user_cache, "get_async_redis_client", lambda: SimpleNamespace(delete=delete))
+    user = User(
+        id=uuid4(),
+        username="teacher",
+        display_name="Teacher",
+        is_teacher=True,
+        is_admin=False,
+        email="a@mail.com",
+        password_hash=b"hash",
+    )
+    session = FakeSession(user)
+    assert await get_cached_user(session, user.id) is user
+    cached, fingerprint = await get_cached_user_with_fingerprint(session, user.id)
+    assert (cached.id, cached.username, cached.is_teacher) == (user.id, "teacher", True)
+    assert fingerprint == get_password_fingerprint(b"hash")
+    assert session.queries == 1
+    # Password hash is not shared through Redis
+    assert "password_hash" not in redis[user.id]
+    # Other process gets user from Redis
+    user_cache._local_users.clear()
+    await get_cached_user(session, user.id)
+    assert session.queries == 1
+    # Changed user is loaded again
+    await invalidate_cached_users({user.id})
+    await get_cached_user(session, user.id)
+    assert session.queries == 2
+
+
+async def test_changed_user_is_invalidated_after_commit(monkeypatch):
+    invalidated = []
+
+    async def invalidate_cached_users(user_ids):
+        invalidated.append(user_ids)
+
+    monkeypatch.setattr(user_cache, "invalidate_cached_users", invalidate_cached_users)
+    user_id = uuid4()
+    session = SimpleNamespace(info={user_cache.CHANGED_USERS: {user_id}})
+    users_committed(session)
+    await asyncio.gather(*user_cache._invalidations)
+    assert invalidated == [{user_id}]
+    assert user_cache.CHANGED_USERS not in session.info
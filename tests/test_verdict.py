@@ -0,0 +1,39 @@
+from collections import Counter
+
+import pytest
+
+from app.db import SubmissionStatus, Attempt
+from app.utils.verdict import get_verdict, get_attempt_verdict, get_status_counts
+
+
+@pytest.mark.parametrize(
+    "statuses,excepted",
+    [
+        ([SubmissionStatus.ACCEPTED] * 3, SubmissionStatus.ACCEPTED),
+        (
+            [SubmissionStatus.ACCEPTED, SubmissionStatus.WRONG_ANSWER, SubmissionStatus.SERVICE_ERROR],
+            SubmissionStatus.SERVICE_ERROR,
+        ),
+        (
+            [SubmissionStatus.WRONG_ANSWER, SubmissionStatus.RUNTIME_ERROR, SubmissionStatus.RUNTIME_ERROR],
+            SubmissionStatus.RUNTIME_ERROR,
+        ),
+        ([SubmissionStatus.ACCEPTED, SubmissionStatus.SKIPPED], SubmissionStatus.ACCEPTED),
+        (
+            [SubmissionStatus.WRONG_ANSWER] + [SubmissionStatus.SKIPPED] * 5,
+            SubmissionStatus.WRONG_ANSWER,
+        ),
+    ]
+)
+def test_attempt_verdict(statuses, excepted):
+    assert get_attempt_verdict(statuses) == excepted
+    # Counters kept on attempt give the same verdict
+    assert get_verdict(Counter({status: statuses.count(status) for status in set(statuses)})) == excepted
+
+
+def test_status_counts():
+    attempt = Attempt(accepted_count=2, wrong_answer_count=1, skipped_count=0)
+    attempt.time_limit_exceed_count = attempt.memory_limit_exceed_count = attempt.runtime_error_count = 0
+    attempt.compilation_error_count = attempt.service_error_count = 0
+    assert attempt.status_counts == {SubmissionStatus.ACCEPTED: 2, SubmissionStatus.WRONG_ANSWER: 1}
+    assert get_verdict(get_status_counts(attempt)) == SubmissionStatus.WRONG_ANSWER
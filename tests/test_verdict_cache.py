@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from app.utils.verdict_cache import get_verdict_key
+
+
+def make_practice(**kwargs):
+    fields = dict(
+        memory_limit=128000,
+        time_limit=1000,
+        max_threads=1,
+        network=False,
+        command_line_args="",
+        execution_mode="PER_TEST",
+        fail_fast=False,
+    )
+    return SimpleNamespace(**(fields | kwargs))
+
+
+def make_testcase(id, input="2 + 2", excepted="4"):
+    return SimpleNamespace(id=id, input=input, excepted=excepted)
+
+
+def test_verdict_key_is_stable():
+    testcases = [make_testcase(1), make_testcase(2)]
+    assert (
+        get_verdict_key(make_practice(), testcases, "print(4)", 1) ==
+        get_verdict_key(make_practice(), list(reversed(testcases)), "print(4)", 1)
+    )
+
+
+def test_verdict_key_depends_on_attempt_and_practice():
+    testcases = [make_testcase(1)]
+    key = get_verdict_key(make_practice(), testcases, "print(4)", 1)
+    assert key != get_verdict_key(make_practice(), testcases, "print(5)", 1)
+    assert key != get_verdict_key(make_practice(), testcases, "print(4)", 2)
+    assert key != get_verdict_key(make_practice(time_limit=2000), testcases, "print(4)", 1)
+    assert key != get_verdict_key(make_practice(execution_mode="SINGLE_RUN"), testcases, "print(4)", 1)
+    assert key != get_verdict_key(make_practice(fail_fast=True), testcases, "print(4)", 1)
+    assert key != get_verdict_key(make_practice(), [make_testcase(1, excepted="5")], "print(4)", 1)
+    assert key != get_verdict_key(make_practice(), [make_testcase(1), make_testcase(2)], "print(4)", 1)
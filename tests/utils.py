@@ -6,7 +6,7 @@ import base64
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import User
-from app.utils import create_user
+from app.utils.auth import create_user
 from app.db import Course, Practice, TestCase
 from app.config.languages import LANGUAGES
 
@@ -17,7 +17,7 @@ def get_user_authorization_header(user: User, password: str) -> dict[str, str]:
     }
 
 
-async def create_test_user(session: AsyncSession, is_teacher=False):
+async def create_test_user(session: AsyncSession, is_teacher=False, is_admin=False):
     password = "123"
     user = await create_user(
         session=session,
@@ -25,7 +25,7 @@ async def create_test_user(session: AsyncSession, is_teacher=False):
         username=f"test_user_{int(time() * 1000)}",
         display_name="test_display_name",
         is_teacher=is_teacher,
-        is_admin=False,
+        is_admin=is_admin,
         email="a@mail.com",
     )
     return user, password